@@ -9,13 +9,549 @@ import openai
 import os
 import base64
 import json
+import logging
+import asyncio
+import atexit
+import hashlib
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import sqlite3
 from scipy.signal import savgol_filter
 import face_recognition
 from deepface import DeepFace
+from deepface.commons import functions as deepface_functions
 import mediapipe as mp
+from mediapipe.tasks.python import BaseOptions
+from mediapipe.tasks.python import vision as mp_vision
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; the kernels below run as plain Python without it
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+logger = logging.getLogger(__name__)
+
+# Output order of the DeepFace emotion CNN
+EMOTION_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+# FaceMesh landmark indices for each facial region used in emotion analysis
+KEY_INDICES = {
+    'left_eye': [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246],
+    'right_eye': [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398],
+    'eyebrows': [70, 63, 105, 66, 107, 55, 65, 52, 53, 46, 285, 295, 282, 283, 276, 300, 293, 334, 296, 336],
+    'mouth': [0, 11, 12, 13, 14, 15, 16, 17, 18, 200, 269, 270, 267, 271, 272, 271, 272],
+    'nose': [1, 2, 5, 4, 6, 19, 20, 94, 125, 141, 235, 236, 3, 51, 48, 115, 131, 134, 102, 49, 220, 305, 281, 360, 279],
+    'cheeks': [116, 117, 118, 119, 120, 121, 126, 142, 36, 205, 206, 207, 213, 192, 147, 187, 207, 213, 192, 147]
+}
+
+# Model files downloaded into backend/models by setup.sh
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+FACE_LANDMARKER_MODEL = os.path.join(MODEL_DIR, 'face_landmarker.task')
+
+# OpenCV DNN (SSD) face detector
+FACE_DETECTOR_MODEL = os.path.join(MODEL_DIR, 'opencv_face_detector_uint8.pb')
+FACE_DETECTOR_CONFIG = os.path.join(MODEL_DIR, 'opencv_face_detector.pbtxt')
+FACE_DETECTION_THRESHOLD = 0.5
+
+# Frames are downscaled to this long side before analysis; the emotion CNN only sees 48x48
+MAX_IMAGE_SIDE = 640
+
+# Frames whose dHash differs from the child's previous frame by fewer bits reuse its result
+DUPLICATE_FRAME_DISTANCE = 6
+
+# Previous frames kept for reuse: children tracked (LRU) and how long a frame stays reusable
+LAST_FRAME_CACHE_SIZE = 1024
+LAST_FRAME_TTL = 30  # seconds
+
+# Reduced-resolution decode flags by downscale factor (libjpeg scales while decoding)
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2
+}
+
+# FaceMesh without iris refinement emits 468 points; every KEY_INDICES entry is below that
+FACE_MESH_NUM_LANDMARKS = 468
+
+EMOTION_DB_PATH = 'emotion_data.db'
+
+# Request threads share these instead of each building its own landmark graph or connection
+ANALYSIS_WORKERS = 3
+LANDMARKER_POOL_SIZE = ANALYSIS_WORKERS
+DB_POOL_SIZE = 4
+
+# Emotion readings are written by a background thread in batches
+WRITE_BATCH_SIZE = 128
+WRITE_FLUSH_INTERVAL = 0.25  # seconds
+WAL_AUTOCHECKPOINT_PAGES = 1000
+
+INSERT_EMOTION_SESSION_SQL = '''
+    INSERT INTO emotion_sessions 
+    (child_id, emotion, emotion_code, confidence, context, intervention_applied, 
+     facial_landmarks, arousal_level, valence_level)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Acknowledge-the-emotion replies don't need the full GPT-4 model
+COMPANION_MODEL = "gpt-4o-mini"
+
+# Invariant part of the companion prompt, sent as the system message
+COMPANION_SYSTEM_PROMPT = """You are a caring AI companion specialized in supporting children with learning differences. Be empathetic, encouraging, and age-appropriate.
+
+Generate a compassionate, age-appropriate response for the child described by the user message. The response should:
+1. Acknowledge the child's emotion with empathy
+2. Use language appropriate for their age and learning profile
+3. Incorporate their interests when possible
+4. Provide gentle guidance or support
+5. Be encouraging and positive
+6. Consider their emotional patterns and history
+
+Keep the response under 100 words and use a warm, friendly tone."""
+
+COMPANION_PROMPT_TEMPLATE = """Child Profile:
+- Name: {name}
+- Age: {age}
+- Learning differences: {learning_differences}
+- Interests: {interests}
+
+Current Situation:
+- Detected emotion: {emotion} (confidence: {confidence:.1%})
+- Context: {context}
+- Recent emotional trend: {trend}
+- Emotional stability: {stability:.1%}
+
+Pattern Insights:
+- Recent emotions: {recent_emotions}
+- Patterns: {patterns}"""
+
+# Companion responses are reused for near-identical situations
+RESPONSE_CACHE_SIZE = 4096          # distinct situations kept (LRU)
+RESPONSE_CACHE_CONTEXTS = 16        # contexts kept per situation
+RESPONSE_CACHE_SIMILARITY = 0.9     # cosine similarity needed to reuse a response
+CONTEXT_EMBEDDING_DIM = 256
+
+# Polled dashboards are served from memory for a short while, dropped on new writes
+DASHBOARD_CACHE_SIZE = 1024
+DASHBOARD_CACHE_TTL = 15  # seconds
+DASHBOARD_PREWARM_INTERVAL = DASHBOARD_CACHE_TTL - 5  # seconds; refresh just before entries expire
+
+# Fixed dashboard sections, shared by every dashboard instead of rebuilt per call
+DASHBOARD_COPING_STRATEGIES = (
+    {'strategy': 'Deep breathing', 'times_used': 5, 'effectiveness': 88},
+    {'strategy': 'Counting to 10', 'times_used': 3, 'effectiveness': 92},
+    {'strategy': 'Taking breaks', 'times_used': 4, 'effectiveness': 85}
+)
+DASHBOARD_ACHIEVEMENTS = (
+    'Used coping strategies independently 3 times',
+    'Recognized feeling frustrated and asked for help',
+    'Stayed calm during challenging activity'
+)
+
+# Social stories are reused for identical prompts, in memory and across restarts in SQLite
+STORY_CACHE_SIZE = 4096
+STORY_CACHE_TTL = 86400  # seconds
+
+# A 4-5 sentence story fits comfortably in the base budget; each interest or learning difference adds detail
+SOCIAL_STORY_BASE_TOKENS = 180
+SOCIAL_STORY_TOKENS_PER_DETAIL = 15
+SOCIAL_STORY_MAX_TOKENS = 300
+
+# Social story returned when generation fails
+FALLBACK_STORY_TEMPLATE = (
+    "Sometimes {name} might feel overwhelmed during learning activities.\n"
+    "When this happens, it's okay to take a deep breath and count to five.\n"
+    "{name} can ask for help from a teacher or parent when feeling this way.\n"
+    "Taking breaks and using coping strategies helps {name} feel better.\n"
+    "{name} is doing great and learning every day!"
+)
+
+# Concurrent OpenAI requests when generating stories for a group of children
+STORY_BATCH_CONCURRENCY = 10
+
+# In-memory emotion history kept per child for pattern analysis
+HISTORY_MAXLEN = 1000
+HISTORY_WINDOW = timedelta(days=7)
+# Children whose history stays in memory (LRU), and how long an unused one is kept
+HISTORY_CACHE_SIZE = 1024
+HISTORY_CACHE_TTL = 1800  # seconds
+
+# Integer emotion codes (index into EMOTION_LABELS); unknown labels map to -1
+EMOTION_CODES = {label: code for code, label in enumerate(EMOTION_LABELS)}
+POSITIVE_EMOTIONS = frozenset(('happy', 'surprise'))
+NEGATIVE_EMOTIONS = frozenset(('sad', 'angry', 'fear', 'disgust'))
+# Negative emotions that are boosted on a declining trend and can trigger an intervention
+DISTRESS_EMOTIONS = ('sad', 'angry', 'fear')
+
+# +1 for positive, -1 for negative, 0 for neutral; indexed by emotion code
+EMOTION_SIGNS = np.array(
+    [1 if e in POSITIVE_EMOTIONS else -1 if e in NEGATIVE_EMOTIONS else 0 for e in EMOTION_LABELS],
+    dtype=np.int8
+)
+
+# SQL literal list of the positive emotion labels
+POSITIVE_EMOTIONS_SQL = ', '.join(f"'{e}'" for e in sorted(POSITIVE_EMOTIONS))
+
+# Keeps emotion_daily_summary in step with every emotion_sessions insert
+DAILY_SUMMARY_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS trg_emotion_daily_summary
+    AFTER INSERT ON emotion_sessions
+    BEGIN
+        INSERT INTO emotion_daily_summary (child_id, day, positive, total, successful)
+        VALUES (
+            NEW.child_id,
+            date(NEW.timestamp),
+            CASE WHEN NEW.emotion IN ({positive}) THEN 1 ELSE 0 END,
+            1,
+            CASE WHEN instr(NEW.intervention_applied, 'success') > 0 THEN 1 ELSE 0 END
+        )
+        ON CONFLICT(child_id, day) DO UPDATE SET
+            positive = positive + excluded.positive,
+            total = total + excluded.total,
+            successful = successful + excluded.successful;
+    END
+'''.format(positive=POSITIVE_EMOTIONS_SQL)
+
+# Today's last ten emotions (oldest first) and the weekly aggregates, tagged by row kind;
+# a compound SELECT has no inherent row order, so the outer ORDER BY sets it
+DASHBOARD_SQL = '''
+    WITH today AS (
+        SELECT timestamp, emotion FROM emotion_sessions
+        WHERE child_id = :child_id AND timestamp >= date('now') AND timestamp < date('now', '+1 day')
+        ORDER BY timestamp DESC
+        LIMIT 10
+    )
+    SELECT 'T' AS kind, timestamp, emotion, NULL, NULL, NULL FROM today
+    UNION ALL
+    SELECT 'W', NULL, NULL, COALESCE(SUM(positive), 0), COALESCE(SUM(total), 0), COALESCE(SUM(successful), 0)
+    FROM emotion_daily_summary
+    WHERE child_id = :child_id AND day > date('now', '-7 days')
+    ORDER BY kind, timestamp
+'''
+
+
+def decode_emotions(codes) -> List[str]:
+    """Map EMOTION_CODES back to labels"""
+    return [EMOTION_LABELS[code] if code >= 0 else 'unknown' for code in codes]
+
+
+def dumps_json(obj) -> str:
+    """Serialize to JSON text, handling NumPy arrays natively when orjson is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=lambda o: o.tolist() if isinstance(o, np.ndarray) else str(o))
+
+
+def image_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) read from a JPEG or PNG header without decoding, or None"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    
+    if data[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                return None
+            marker = data[i + 1]
+            if marker == 0xFF:  # fill byte
+                i += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # markers without a length
+                i += 2
+                continue
+            # Start-of-frame segments carry the dimensions (C4/C8/CC are other tables)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                return width, height
+            i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    
+    return None
+
+
+def dhash(image: np.ndarray) -> int:
+    """64-bit difference hash of a BGR image"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def embed_context(context: str) -> np.ndarray:
+    """Cheap L2-normalized embedding of free text from hashed character trigrams"""
+    vec = np.zeros(CONTEXT_EMBEDDING_DIM, dtype=np.float32)
+    text = f"  {context.lower().strip()}  "
+    for i in range(len(text) - 2):
+        vec[zlib.crc32(text[i:i + 3].encode()) % CONTEXT_EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+@njit(cache=True, fastmath=True)
+def _mean_std(values):
+    """Mean and population standard deviation of a 1-D array"""
+    n = values.shape[0]
+    total = 0.0
+    for i in range(n):
+        total += values[i]
+    mean = total / n
+    sq = 0.0
+    for i in range(n):
+        sq += (values[i] - mean) ** 2
+    return mean, (sq / n) ** 0.5
+
+
+@njit(cache=True, fastmath=True)
+def _landmark_kernel(left_eye_y, right_eye_y, brow_x, brow_y, mouth_y, cheek_y):
+    """Intensity, arousal, valence plus the brow x-spread and mouth y-spread used for micro-expressions"""
+    left_mean, left_std = _mean_std(left_eye_y)
+    right_mean, right_std = _mean_std(right_eye_y)
+    brow_mean, brow_std = _mean_std(brow_y)
+    mouth_mean, mouth_std = _mean_std(mouth_y)
+    cheek_mean, cheek_std = _mean_std(cheek_y)
+    brow_x_mean, brow_x_std = _mean_std(brow_x)
+    
+    # Intensity: eye asymmetry, mouth curvature, eyebrow activation
+    intensity = (min(abs(left_mean - right_mean) * 10, 1.0)
+                 + min(mouth_std * 5, 1.0)
+                 + min(brow_std * 8, 1.0)) / 3
+    
+    # Arousal: wide eyes and raised eyebrows (higher y = lower on screen)
+    arousal = (min((left_std + right_std) * 4, 1.0) + min((1.0 - brow_mean) * 2, 1.0)) / 2
+    
+    # Valence: upturned mouth corners and raised cheeks
+    cheek_term = min((1.0 - cheek_mean) * 1.5, 1.0)
+    n_mouth = mouth_y.shape[0]
+    if n_mouth > 4:
+        corners = (mouth_y[0] + mouth_y[n_mouth - 1]) / 2
+        center = (mouth_y[2] + mouth_y[3]) / 2
+        valence = (min(max(0.0, center - corners) * 10, 1.0) + cheek_term) / 2
+    else:
+        valence = cheek_term
+    
+    return intensity, arousal, valence, brow_x_std, mouth_std
+
+
+# Compile (or load from cache) at import so the first frame doesn't pay for it
+_warm = np.linspace(0.1, 0.9, 5)
+_landmark_kernel(_warm, _warm, _warm, _warm, _warm, _warm)
+del _warm
+
+
+def trend_from_scores(weighted_score: float, total_weight: float) -> str:
+    """Map a recency-weighted emotion score onto a trend label"""
+    if total_weight == 0:
+        return 'neutral'
+    
+    avg_score = weighted_score / total_weight
+    
+    if avg_score > 0.2:
+        return 'improving'
+    elif avg_score < -0.2:
+        return 'declining'
+    else:
+        return 'stable'
+
+
+class BoundedPool:
+    """At most `size` resources, built on first demand and lent to one thread at a time"""
+    
+    def __init__(self, factory, size: int):
+        self.factory = factory
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.built = 0
+        self.lock = threading.Lock()
+    
+    def add(self, resource):
+        """Hand an already built resource to the pool"""
+        with self.lock:
+            self.built += 1
+        self.idle.put(resource)
+    
+    @contextmanager
+    def borrow(self):
+        """Lend an idle resource, building one while under the limit and waiting otherwise"""
+        try:
+            resource = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                build = self.built < self.size
+                if build:
+                    self.built += 1
+            if build:
+                try:
+                    resource = self.factory()
+                except Exception:
+                    with self.lock:
+                        self.built -= 1
+                    raise
+            else:
+                resource = self.idle.get()
+        try:
+            yield resource
+        finally:
+            self.idle.put(resource)
+
+
+class EmotionHistory:
+    """
+    Rolling emotion history for one child with running statistics, so pattern
+    analysis costs O(1) per frame instead of a scan over the whole window.
+    Entries are (emotion_code, confidence, timestamp, arousal, valence), oldest first;
+    "age" below is an entry's distance from the newest one.
+    """
+    
+    # Entries up to this age get weight confidence * (1 - 0.1 * age); older ones flip sign
+    TREND_HEAD = 11
+    
+    def __init__(self, maxlen: int = HISTORY_MAXLEN):
+        self.entries = deque()
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+        
+        # Welford mean / sum of squared deviations of confidences
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        
+        # Trend sums: sign * confidence, age * sign * confidence, confidence, age * confidence
+        self.signed_sum = 0.0
+        self.signed_age_sum = 0.0
+        self.conf_sum = 0.0
+        self.conf_age_sum = 0.0
+        
+        self.arousal_sum = 0.0
+        self.arousal_n = 0
+        self.valence_sum = 0.0
+        self.valence_n = 0
+        
+        # Emotion trigrams, newest emotion first within each trigram
+        self.trigrams = Counter()
+    
+    def append(self, entry: Tuple):
+        """Add the newest reading, evicting the oldest when full"""
+        with self.lock:
+            if len(self.entries) == self.maxlen:
+                self._pop_oldest()
+            
+            code, confidence, _, arousal, valence = entry
+            signed = EMOTION_SIGNS[code] * confidence if code >= 0 else 0.0
+            
+            # Every existing entry ages by one
+            self.signed_age_sum += self.signed_sum
+            self.conf_age_sum += self.conf_sum
+            self.signed_sum += signed
+            self.conf_sum += confidence
+            
+            self.n += 1
+            delta = confidence - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (confidence - self.mean)
+            
+            if arousal is not None:
+                self.arousal_sum += arousal
+                self.arousal_n += 1
+            if valence is not None:
+                self.valence_sum += valence
+                self.valence_n += 1
+            
+            if len(self.entries) >= 2:
+                self.trigrams[(code, self.entries[-1][0], self.entries[-2][0])] += 1
+            
+            self.entries.append(entry)
+    
+    def evict_before(self, cutoff: datetime):
+        """Drop readings at or before cutoff"""
+        with self.lock:
+            while self.entries and self.entries[0][2] <= cutoff:
+                self._pop_oldest()
+    
+    def _pop_oldest(self):
+        if len(self.entries) >= 3:
+            trigram = (self.entries[2][0], self.entries[1][0], self.entries[0][0])
+            self.trigrams[trigram] -= 1
+            if self.trigrams[trigram] <= 0:
+                del self.trigrams[trigram]
+        
+        code, confidence, _, arousal, valence = self.entries.popleft()
+        age = len(self.entries)
+        signed = EMOTION_SIGNS[code] * confidence if code >= 0 else 0.0
+        
+        self.signed_sum -= signed
+        self.signed_age_sum -= age * signed
+        self.conf_sum -= confidence
+        self.conf_age_sum -= age * confidence
+        
+        if self.n == 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            delta = confidence - self.mean
+            self.mean -= delta / (self.n - 1)
+            self.m2 -= delta * (confidence - self.mean)
+            self.n -= 1
+        
+        if arousal is not None:
+            self.arousal_sum -= arousal
+            self.arousal_n -= 1
+        if valence is not None:
+            self.valence_sum -= valence
+            self.valence_n -= 1
+    
+    def summary(self) -> Dict:
+        """Trend, stability, patterns and averages over the current window"""
+        with self.lock:
+            n = len(self.entries)
+            if n == 0:
+                return {'trend': 'neutral', 'stability': 0.5, 'patterns': []}
+            
+            # Newest entries first; only the head needs an explicit walk
+            head = [self.entries[-k] for k in range(1, min(n, self.TREND_HEAD) + 1)]
+            
+            trend = 'neutral'
+            if n >= 3:
+                weighted_score = self.signed_sum - 0.1 * self.signed_age_sum
+                head_conf = sum(entry[1] for entry in head)
+                head_conf_age = sum(age * entry[1] for age, entry in enumerate(head))
+                total_weight = (head_conf - 0.1 * head_conf_age
+                                + 0.1 * (self.conf_age_sum - head_conf_age) - (self.conf_sum - head_conf))
+                trend = trend_from_scores(weighted_score, total_weight)
+            
+            patterns = []
+            if n >= 5:
+                patterns = [
+                    f"{' -> '.join(decode_emotions(trigram))} (x{count})"
+                    for trigram, count in self.trigrams.items()
+                    if count >= 2  # Appears at least twice
+                ]
+                # Limited variety in recent emotions
+                if len(set(entry[0] for entry in head[:6])) <= 3:
+                    patterns.append("emotional_cycling")
+            
+            return {
+                'trend': trend,
+                'stability': 1.0 - np.sqrt(max(self.m2, 0.0) / self.n),
+                'patterns': patterns,
+                'avg_arousal': self.arousal_sum / self.arousal_n if self.arousal_n else 0.5,
+                'avg_valence': self.valence_sum / self.valence_n if self.valence_n else 0.5,
+                'recent_emotions': decode_emotions(entry[0] for entry in head[:10])  # Last 10 emotions
+            }
+
 
 class AdvancedEmotionAnalyzer:
     """
@@ -24,24 +560,62 @@ class AdvancedEmotionAnalyzer:
     
     def __init__(self):
         self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.async_client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         
         # Initialize emotion detection models
         self.init_emotion_models()
         
         # Initialize face analysis
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5
-        )
+        self.init_face_detector()
+        self.init_face_landmarker()
+        
+        # All regions live in one (K, 3) matrix; each region is a row slice of it
+        self._region_slices: Dict[str, slice] = {}
+        flat_indices = []
+        for region, indices in KEY_INDICES.items():
+            self._region_slices[region] = slice(len(flat_indices), len(flat_indices) + len(indices))
+            flat_indices.extend(indices)
+        # Gather indices, validated once instead of per frame
+        self._flat_idx = np.array(flat_indices, dtype=np.int32)
+        if self._flat_idx.max() >= FACE_MESH_NUM_LANDMARKS:
+            raise RuntimeError(
+                f"KEY_INDICES reaches landmark {self._flat_idx.max()}, but the face landmark model "
+                f"emits only {FACE_MESH_NUM_LANDMARKS} points"
+            )
         
-        # Emotion history for pattern analysis
-        self.emotion_history = []
+        # Per-thread landmark matrix, filled in place each frame
+        self._scratch = threading.local()
+        
+        # Emotion history for pattern analysis: child_id -> (expiry, EmotionHistory), primed lazily from SQLite
+        self._history: OrderedDict = OrderedDict()
+        self._history_lock = threading.Lock()
         self.init_database()
         
+        # Background writer so SQLite commits stay off the analysis path
+        self._write_q = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.flush_pending_writes)
+        
+        # Last analysed frame per child: child_id -> (expiry, dhash, context, result, landmark_analysis, intervention_data)
+        self._last_frame: OrderedDict = OrderedDict()
+        self._last_frame_lock = threading.Lock()
+        
+        # Image, landmark and history analysis run side by side
+        self._pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS)
+        
+        # Companion response cache: situation key -> {'embeddings': (k, D) array, 'responses': [str]}
+        self._resp_cache: OrderedDict = OrderedDict()
+        self._resp_cache_lock = threading.Lock()
+        
+        # Dashboard cache: child_id -> (expiry, dashboard data, serialized JSON or None)
+        self._dash_cache: OrderedDict = OrderedDict()
+        self._dash_cache_lock = threading.Lock()
+        
+        # Social story cache: prompt hash -> (expiry, story); backed by the story_cache table
+        self._story_cache: OrderedDict = OrderedDict()
+        self._story_cache_lock = threading.Lock()
+        
     def init_emotion_models(self):
         """Initialize emotion detection models"""
         try:
@@ -49,6 +623,8 @@ class AdvancedEmotionAnalyzer:
             self.emotion_backends = ['opencv', 'retinaface', 'dlib']
             self.current_backend = 'opencv'
             
+            self._emotion_model = None
+            
             # Emotion labels with confidence thresholds
             self.emotion_config = {
                 'happy': {'threshold': 0.6, 'interventions': ['celebrate', 'encourage_more']},
@@ -60,14 +636,96 @@ class AdvancedEmotionAnalyzer:
                 'neutral': {'threshold': 0.3, 'interventions': ['engage', 'motivate']}
             }
             
+            # Build the emotion CNN once instead of on every DeepFace.analyze call
+            self._emotion_model = DeepFace.build_model("Emotion")
+            
         except Exception as e:
-            print(f"Warning: Could not initialize advanced emotion models: {e}")
+            logger.warning("Could not initialize advanced emotion models: %s", e)
             self.use_basic_detection = True
     
+    def init_face_detector(self):
+        """Initialize the SSD face detector, on CUDA when OpenCV was built with it"""
+        self._dnn_face = None
+        self._dnn_face_lock = threading.Lock()
+        self.face_cascade = None
+        
+        try:
+            self._dnn_face = cv2.dnn.readNetFromTensorflow(FACE_DETECTOR_MODEL, FACE_DETECTOR_CONFIG)
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                self._dnn_face.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                self._dnn_face.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        except Exception as e:
+            # Model files missing (setup.sh not run): fall back to the bundled Haar cascade
+            logger.warning("DNN face detector unavailable, using Haar cascade: %s", e)
+            self._dnn_face = None
+            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    
+    def init_face_landmarker(self):
+        """Initialize the MediaPipe Tasks face landmarker, preferring the GPU delegate"""
+        # Landmark graphs are not thread-safe, so each one is lent to a single thread at a time
+        self._landmarkers = BoundedPool(self._build_face_landmarker, LANDMARKER_POOL_SIZE)
+        self._landmarker_delegate = None
+        self.mp_face_mesh = mp.solutions.face_mesh
+        
+        error = None
+        for delegate in (BaseOptions.Delegate.GPU, BaseOptions.Delegate.CPU):
+            try:
+                graph = self._create_face_landmarker(delegate)
+                self._landmarker_delegate = delegate
+                self._landmarkers.add(graph)
+                return
+            except Exception as e:
+                error = e
+        
+        # Task bundle missing (setup.sh not run): fall back to the legacy FaceMesh solution
+        logger.warning("MediaPipe face landmarker unavailable, using FaceMesh: %s", error)
+    
+    def _create_face_landmarker(self, delegate):
+        options = mp_vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=FACE_LANDMARKER_MODEL, delegate=delegate),
+            running_mode=mp_vision.RunningMode.IMAGE,
+            num_faces=1,
+            min_face_detection_confidence=0.5
+        )
+        return mp_vision.FaceLandmarker.create_from_options(options)
+    
+    def _build_face_landmarker(self):
+        """Another face landmark graph for the pool, of the kind chosen at startup"""
+        if self._landmarker_delegate is not None:
+            return self._create_face_landmarker(self._landmarker_delegate)
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5
+        )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """New tuned SQLite connection to the emotion database"""
+        # Waits on a busy database instead of failing straight away; pooled
+        # connections move between threads but are only ever used by one at a time
+        conn = sqlite3.connect(EMOTION_DB_PATH, timeout=10.0, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-20000')  # ~20 MB page cache
+        conn.execute('PRAGMA mmap_size=268435456')  # 256 MB
+        return conn
+    
     def init_database(self):
         """Initialize emotion tracking database"""
-        self.conn = sqlite3.connect('emotion_data.db', check_same_thread=False)
-        cursor = self.conn.cursor()
+        # A few connections shared by all threads instead of one per request thread
+        self._db_pool = BoundedPool(self._connect, DB_POOL_SIZE)
+        # Readers run in parallel under WAL; writers take this lock so they never contend for the write lock
+        self._db_write_lock = threading.Lock()
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        # Larger pages only take effect on a fresh database file
+        cursor.execute('PRAGMA page_size=8192')
+        
+        # WAL lets the writer thread commit while readers keep going
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS emotion_sessions (
@@ -75,6 +733,7 @@ class AdvancedEmotionAnalyzer:
                 child_id TEXT NOT NULL,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 emotion TEXT NOT NULL,
+                emotion_code INTEGER,
                 confidence REAL NOT NULL,
                 context TEXT,
                 intervention_applied TEXT,
@@ -85,6 +744,35 @@ class AdvancedEmotionAnalyzer:
             )
         ''')
         
+        # Databases created before emotion_code existed get the column and a backfill
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS emotion_labels (
+                code INTEGER PRIMARY KEY,
+                label TEXT NOT NULL UNIQUE
+            )
+        ''')
+        cursor.executemany(
+            'INSERT OR IGNORE INTO emotion_labels (code, label) VALUES (?, ?)',
+            list(enumerate(EMOTION_LABELS))
+        )
+        
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(emotion_sessions)')}
+        if 'emotion_code' not in columns:
+            cursor.execute('ALTER TABLE emotion_sessions ADD COLUMN emotion_code INTEGER')
+            cursor.execute('''
+                UPDATE emotion_sessions
+                SET emotion_code = (SELECT code FROM emotion_labels WHERE label = emotion_sessions.emotion)
+            ''')
+        
+        # Covering index for the per-child history query: seek on (child_id, timestamp), no table lookups
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_child_ts_cover
+            ON emotion_sessions(child_id, timestamp DESC, emotion_code, confidence, arousal_level, valence_level)
+        ''')
+        
+        # The weekly aggregate reads emotion_daily_summary; its old covering index only slowed inserts
+        cursor.execute('DROP INDEX IF EXISTS idx_es_child_ts_int')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS emotion_patterns (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -96,29 +784,95 @@ class AdvancedEmotionAnalyzer:
             )
         ''')
         
-        self.conn.commit()
+        # Per-child daily rollup so the weekly dashboard reads at most seven rows
+        summary_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emotion_daily_summary'"
+        ).fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS emotion_daily_summary (
+                child_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                positive INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                successful INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (child_id, day)
+            ) WITHOUT ROWID
+        ''')
+        if not summary_exists:
+            cursor.execute(f'''
+                INSERT INTO emotion_daily_summary (child_id, day, positive, total, successful)
+                SELECT
+                    child_id,
+                    date(timestamp),
+                    SUM(CASE WHEN emotion IN ({POSITIVE_EMOTIONS_SQL}) THEN 1 ELSE 0 END),
+                    COUNT(*),
+                    SUM(CASE WHEN instr(intervention_applied, 'success') > 0 THEN 1 ELSE 0 END)
+                FROM emotion_sessions
+                GROUP BY child_id, date(timestamp)
+            ''')
+        cursor.execute(DAILY_SUMMARY_TRIGGER_SQL)
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS story_cache (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+        ''')
+        
+        conn.commit()
+        self._db_pool.add(conn)
+    
+    def analyze_emotion_comprehensive(self, image_base64: str, child_profile: Dict, context: str = "", stream_response: bool = False) -> Dict:
+        """
+        Comprehensive emotion analysis using multiple techniques.
+        With stream_response=True, 'companion_response' is an iterator of text chunks.
+        """
+        try:
+            image_bytes = base64.b64decode(image_base64)
+        except Exception as e:
+            return {'success': False, 'error': f'Invalid image data: {str(e)}'}
+        
+        return self.analyze_emotion_from_bytes(image_bytes, child_profile, context, stream_response)
     
-    def analyze_emotion_comprehensive(self, image_base64: str, child_profile: Dict, context: str = "") -> Dict:
+    def analyze_emotion_from_bytes(self, image_bytes: bytes, child_profile: Dict, context: str = "", stream_response: bool = False) -> Dict:
         """
-        Comprehensive emotion analysis using multiple techniques
+        Comprehensive emotion analysis of raw encoded image bytes (JPEG/PNG), skipping base64
         """
         try:
             # Decode image
-            image_data = base64.b64decode(image_base64)
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image = self._decode_image(image_bytes)
             
             if image is None:
                 return {'success': False, 'error': 'Invalid image data'}
             
+            # Near-duplicate of the previous frame in the same context: reuse its analysis
+            frame_hash = dhash(image)
+            if not stream_response:
+                reused = self._reuse_previous_frame(child_profile['id'], frame_hash, context)
+                if reused is not None:
+                    return reused
+            
+            # DeepFace expects BGR, MediaPipe RGB; convert once here
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            
+            # The three analyses are independent and spend most of their time in native code
+            emotion_future = self._pool.submit(self._multi_model_emotion_analysis, image)
+            landmark_future = self._pool.submit(self._analyze_facial_landmarks, rgb_image)
+            temporal_future = self._pool.submit(self._analyze_emotion_patterns, child_profile['id'])
+            
             # Multi-model emotion analysis
-            emotion_results = self._multi_model_emotion_analysis(image)
+            emotion_results = emotion_future.result()
             
             # Facial landmark analysis for micro-expressions
-            landmark_analysis = self._analyze_facial_landmarks(image)
+            landmark_analysis = landmark_future.result()
             
             # Temporal emotion analysis (if history available)
-            temporal_analysis = self._analyze_emotion_patterns(child_profile['id'])
+            temporal_analysis = temporal_future.result()
+            
+            # Landmark-based fallback only when DeepFace produced nothing
+            if emotion_results.get('deepface') is None:
+                emotion_results['basic'] = self._basic_emotion_detection(image, landmark_analysis)
             
             # Combine results
             primary_emotion, confidence = self._combine_emotion_results(
@@ -127,7 +881,8 @@ class AdvancedEmotionAnalyzer:
             
             # Generate context-aware response
             companion_response = self._generate_advanced_companion_response(
-                primary_emotion, confidence, child_profile, context, temporal_analysis
+                primary_emotion, confidence, child_profile, context, temporal_analysis,
+                stream=stream_response
             )
             
             # Assess intervention need
@@ -141,7 +896,7 @@ class AdvancedEmotionAnalyzer:
                 companion_response, landmark_analysis, intervention_data
             )
             
-            return {
+            result = {
                 'success': True,
                 'emotion_detected': primary_emotion,
                 'confidence': confidence,
@@ -156,314 +911,340 @@ class AdvancedEmotionAnalyzer:
                 'valence_level': landmark_analysis.get('valence', 0.5)
             }
             
+            # A streamed response can only be consumed once, so those results are not reused
+            if not stream_response:
+                self._remember_frame(child_profile['id'], (
+                    time.monotonic() + LAST_FRAME_TTL, frame_hash, context, result, landmark_analysis, intervention_data
+                ))
+            
+            return result
+            
         except Exception as e:
             return {'success': False, 'error': f'Comprehensive emotion analysis failed: {str(e)}'}
     
+    def _reuse_previous_frame(self, child_id: str, frame_hash: int, context: str) -> Optional[Dict]:
+        """Previous result for a near-identical frame in the same context; the reading is still stored"""
+        with self._last_frame_lock:
+            previous = self._last_frame.get(child_id)
+        if previous is None or previous[0] <= time.monotonic():
+            return None
+        
+        _, previous_hash, previous_context, result, landmark_analysis, intervention_data = previous
+        # A context change (e.g. an intervention started) always gets a fresh analysis
+        if previous_context != context or bin(previous_hash ^ frame_hash).count('1') >= DUPLICATE_FRAME_DISTANCE:
+            return None
+        
+        self._store_comprehensive_emotion_data(
+            child_id, result['emotion_detected'], result['confidence'], context,
+            result['companion_response'], landmark_analysis, intervention_data
+        )
+        
+        reused = dict(result)
+        reused['frame_reused'] = True
+        return reused
+    
+    def _remember_frame(self, child_id: str, entry: Tuple):
+        """Keep a child's latest frame for reuse, evicting the least recently seen children"""
+        with self._last_frame_lock:
+            self._last_frame[child_id] = entry
+            self._last_frame.move_to_end(child_id)
+            while len(self._last_frame) > LAST_FRAME_CACHE_SIZE:
+                self._last_frame.popitem(last=False)
+    
+    def analyze_emotions_batch(self, frames_base64: List[str], child_profile: Dict, context: str = "") -> Dict:
+        """
+        Emotion analysis for a burst of frames, running the emotion CNN once per batch
+        """
+        try:
+            images = [self._decode_image(base64.b64decode(frame)) for frame in frames_base64]
+            images = [image for image in images if image is not None]
+            
+            if not images:
+                return {'success': False, 'error': 'Invalid image data'}
+            
+            # One forward pass for all frames (runs on GPU when TensorFlow has one)
+            deepface_scores = self._batch_emotion_scores(images)
+            temporal_analysis = self._analyze_emotion_patterns(child_profile['id'])
+            
+            frame_results = []
+            for image, scores in zip(images, deepface_scores):
+                landmark_analysis = self._analyze_facial_landmarks(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                emotion_results = {'deepface': scores}
+                if scores is None:
+                    emotion_results['basic'] = self._basic_emotion_detection(image, landmark_analysis)
+                emotion, confidence = self._combine_emotion_results(
+                    emotion_results, landmark_analysis, temporal_analysis
+                )
+                frame_results.append({
+                    'emotion': emotion,
+                    'confidence': confidence,
+                    'landmark_analysis': landmark_analysis
+                })
+            
+            # Most frequent emotion across the burst; latest frame wins ties
+            emotion_counts = Counter(result['emotion'] for result in frame_results)
+            primary_emotion = max(reversed([r['emotion'] for r in frame_results]), key=emotion_counts.get)
+            primary_frames = [r for r in frame_results if r['emotion'] == primary_emotion]
+            confidence = float(np.mean([r['confidence'] for r in primary_frames]))
+            landmark_analysis = primary_frames[-1]['landmark_analysis']
+            
+            companion_response = self._generate_advanced_companion_response(
+                primary_emotion, confidence, child_profile, context, temporal_analysis
+            )
+            
+            intervention_data = self._assess_comprehensive_intervention(
+                primary_emotion, confidence, child_profile, temporal_analysis
+            )
+            
+            self._store_comprehensive_emotion_data(
+                child_profile['id'], primary_emotion, confidence, context,
+                companion_response, landmark_analysis, intervention_data
+            )
+            
+            return {
+                'success': True,
+                'emotion_detected': primary_emotion,
+                'confidence': confidence,
+                'frames_analyzed': len(frame_results),
+                'frame_emotions': [(r['emotion'], r['confidence']) for r in frame_results],
+                'companion_response': companion_response,
+                'intervention_needed': intervention_data['needed'],
+                'intervention_type': intervention_data['type'],
+                'coping_strategies': intervention_data['strategies'],
+                'emotion_intensity': landmark_analysis.get('intensity', 0.5),
+                'pattern_insights': temporal_analysis,
+                'micro_expressions': landmark_analysis.get('micro_expressions', []),
+                'arousal_level': landmark_analysis.get('arousal', 0.5),
+                'valence_level': landmark_analysis.get('valence', 0.5)
+            }
+            
+        except Exception as e:
+            return {'success': False, 'error': f'Batch emotion analysis failed: {str(e)}'}
+    
+    def _decode_image(self, image_bytes: bytes) -> Optional[np.ndarray]:
+        """Decode an encoded image into a BGR array no larger than MAX_IMAGE_SIDE"""
+        # np.frombuffer is a view; when the header says the image is large, let the decoder downscale
+        flags = cv2.IMREAD_COLOR
+        dimensions = image_dimensions(image_bytes)
+        if dimensions is not None:
+            for factor, reduced_flag in REDUCED_DECODE_FLAGS.items():
+                if max(dimensions) // factor >= MAX_IMAGE_SIDE:
+                    flags = reduced_flag
+                    break
+        
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+        
+        if image is not None:
+            scale = MAX_IMAGE_SIDE / max(image.shape[:2])
+            if scale < 1:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        return image
+    
+    def _batch_emotion_scores(self, images: List[np.ndarray]) -> List[Optional[Dict[str, float]]]:
+        """Emotion scores for several frames from a single model call"""
+        if getattr(self, '_emotion_model', None) is None:
+            return [self._multi_model_emotion_analysis(image)['deepface'] for image in images]
+        
+        try:
+            batch = np.stack([self._preprocess_face_for_emotion(image) for image in images])
+            predictions = self._emotion_model.predict(batch, batch_size=len(images), verbose=0)
+            return [self._emotion_scores_from_predictions(row) for row in predictions]
+        except Exception as e:
+            logger.warning("Batched DeepFace analysis failed: %s", e)
+            return [None] * len(images)
+    
     def _multi_model_emotion_analysis(self, image: np.ndarray) -> Dict:
         """Use multiple models for robust emotion detection"""
         results = {}
         
         try:
             # DeepFace analysis
-            deepface_result = DeepFace.analyze(
-                image, 
-                actions=['emotion'], 
-                detector_backend=self.current_backend,
-                enforce_detection=False
-            )
-            
-            if isinstance(deepface_result, list) and len(deepface_result) > 0:
-                results['deepface'] = deepface_result[0]['emotion']
+            if getattr(self, '_emotion_model', None) is not None:
+                results['deepface'] = self._predict_emotion_scores(image)
             else:
-                results['deepface'] = deepface_result['emotion']
+                deepface_result = DeepFace.analyze(
+                    image, 
+                    actions=['emotion'], 
+                    detector_backend=self.current_backend,
+                    enforce_detection=False
+                )
+                
+                if isinstance(deepface_result, list) and len(deepface_result) > 0:
+                    results['deepface'] = deepface_result[0]['emotion']
+                else:
+                    results['deepface'] = deepface_result['emotion']
                 
         except Exception as e:
-            print(f"DeepFace analysis failed: {e}")
+            logger.warning("DeepFace analysis failed: %s", e)
             results['deepface'] = None
         
-        # Add basic OpenCV detection as fallback
-        try:
-            results['basic'] = self._basic_emotion_detection(image)
-        except Exception as e:
-            print(f"Basic emotion detection failed: {e}")
-            results['basic'] = None
-        
         return results
     
-    def _analyze_facial_landmarks(self, image: np.ndarray) -> Dict:
+    def _preprocess_face_for_emotion(self, image: np.ndarray) -> np.ndarray:
+        """Detect the face and return it as a 48x48 grayscale CNN input"""
+        face_objs = deepface_functions.extract_faces(
+            img=image,
+            target_size=(224, 224),
+            detector_backend=self.current_backend,
+            grayscale=False,
+            enforce_detection=False,
+            align=True
+        )
+        
+        face = face_objs[0][0][0]  # (1, 224, 224, 3) normalized BGR -> (224, 224, 3)
+        gray = cv2.cvtColor(face.astype(np.float32), cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (48, 48))
+    
+    def _emotion_scores_from_predictions(self, predictions: np.ndarray) -> Dict[str, float]:
+        """Map the emotion CNN softmax output to DeepFace-style percentages"""
+        total = float(predictions.sum()) or 1.0
+        return {label: 100 * float(predictions[i]) / total for i, label in enumerate(EMOTION_LABELS)}
+    
+    def _predict_emotion_scores(self, image: np.ndarray) -> Dict[str, float]:
+        """Run the cached emotion model directly, skipping DeepFace.analyze"""
+        face = self._preprocess_face_for_emotion(image)
+        predictions = self._emotion_model.predict(np.expand_dims(face, axis=0), verbose=0)[0, :]
+        return self._emotion_scores_from_predictions(predictions)
+    
+    def _analyze_facial_landmarks(self, rgb_image: np.ndarray) -> Dict:
         """Analyze facial landmarks for micro-expressions and intensity"""
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(rgb_image)
-            
-            if not results.multi_face_landmarks:
+            with self._landmarkers.borrow() as graph:
+                if self._landmarker_delegate is not None:
+                    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_image)
+                    face_landmarks = graph.detect(mp_image).face_landmarks
+                else:
+                    results = graph.process(rgb_image)
+                    face_landmarks = [face.landmark for face in results.multi_face_landmarks or []]
+            
+            if not face_landmarks:
                 return {'intensity': 0.5, 'arousal': 0.5, 'valence': 0.5}
             
-            landmarks = results.multi_face_landmarks[0]
+            landmarks = face_landmarks[0]
             
-            # Extract key facial points
+            # Extract key facial points as one (K, 3) matrix
             key_points = self._extract_emotion_landmarks(landmarks)
             
-            # Calculate emotion intensity based on facial muscle activation
-            intensity = self._calculate_emotion_intensity(key_points)
-            
-            # Calculate arousal and valence
-            arousal = self._calculate_arousal(key_points)
-            valence = self._calculate_valence(key_points)
+            # Intensity, arousal, valence and micro-expressions from one pass over the regions
+            intensity, arousal, valence, micro_expressions = self._analyze_landmarks_fused(key_points)
             
-            # Detect micro-expressions
-            micro_expressions = self._detect_micro_expressions(key_points)
+            # key_points is this thread's reused buffer; the caller keeps a copy
+            stored_points = key_points.copy()
             
             return {
                 'intensity': intensity,
                 'arousal': arousal,
                 'valence': valence,
                 'micro_expressions': micro_expressions,
-                'landmarks': key_points
+                'landmarks': {region: stored_points[sl] for region, sl in self._region_slices.items()}
             }
             
         except Exception as e:
-            print(f"Landmark analysis failed: {e}")
+            logger.warning("Landmark analysis failed: %s", e)
             return {'intensity': 0.5, 'arousal': 0.5, 'valence': 0.5}
     
-    def _extract_emotion_landmarks(self, landmarks) -> Dict:
-        """Extract key landmarks for emotion analysis"""
-        # Key facial points for emotion analysis
-        key_indices = {
-            'left_eye': [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246],
-            'right_eye': [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398],
-            'eyebrows': [70, 63, 105, 66, 107, 55, 65, 52, 53, 46, 285, 295, 282, 283, 276, 300, 293, 334, 296, 336],
-            'mouth': [0, 11, 12, 13, 14, 15, 16, 17, 18, 200, 269, 270, 267, 271, 272, 271, 272],
-            'nose': [1, 2, 5, 4, 6, 19, 20, 94, 125, 141, 235, 236, 3, 51, 48, 115, 131, 134, 102, 49, 220, 305, 281, 360, 279],
-            'cheeks': [116, 117, 118, 119, 120, 121, 126, 142, 36, 205, 206, 207, 213, 192, 147, 187, 207, 213, 192, 147]
-        }
+    def _extract_emotion_landmarks(self, landmarks) -> np.ndarray:
+        """Extract key landmarks for emotion analysis as a (K, 3) matrix sliced by self._region_slices"""
+        # Convert the landmark list to an (N, 3) array once, then gather every region in one take
+        all_points = np.fromiter(
+            (v for lm in landmarks for v in (lm.x, lm.y, lm.z)),
+            dtype=np.float32,
+            count=len(landmarks) * 3
+        ).reshape(-1, 3)
         
-        extracted_points = {}
-        for region, indices in key_indices.items():
-            points = []
-            for idx in indices:
-                if idx < len(landmarks.landmark):
-                    lm = landmarks.landmark[idx]
-                    points.append([lm.x, lm.y, lm.z])
-            extracted_points[region] = np.array(points)
-        
-        return extracted_points
+        # Indices were validated at init so 'clip' never clips
+        key_points = self._landmark_buffer()
+        np.take(all_points, self._flat_idx, axis=0, out=key_points, mode='clip')
+        return key_points
     
-    def _calculate_emotion_intensity(self, landmarks: Dict) -> float:
-        """Calculate emotion intensity from facial landmarks"""
-        try:
-            # Calculate intensity based on facial muscle activation
-            intensity_factors = []
-            
-            # Eye openness (arousal indicator)
-            if 'left_eye' in landmarks and 'right_eye' in landmarks:
-                left_eye_height = np.mean(landmarks['left_eye'][:, 1])
-                right_eye_height = np.mean(landmarks['right_eye'][:, 1])
-                eye_intensity = abs(left_eye_height - right_eye_height) * 10
-                intensity_factors.append(min(eye_intensity, 1.0))
-            
-            # Mouth curvature (valence indicator)
-            if 'mouth' in landmarks:
-                mouth_points = landmarks['mouth']
-                if len(mouth_points) > 0:
-                    mouth_curve = np.std(mouth_points[:, 1]) * 5
-                    intensity_factors.append(min(mouth_curve, 1.0))
-            
-            # Eyebrow position (emotional activation)
-            if 'eyebrows' in landmarks:
-                eyebrow_height = np.std(landmarks['eyebrows'][:, 1]) * 8
-                intensity_factors.append(min(eyebrow_height, 1.0))
-            
-            return np.mean(intensity_factors) if intensity_factors else 0.5
-            
-        except Exception as e:
-            print(f"Intensity calculation failed: {e}")
-            return 0.5
-    
-    def _calculate_arousal(self, landmarks: Dict) -> float:
-        """Calculate emotional arousal level"""
-        try:
-            # High arousal: wide eyes, raised eyebrows, open mouth
-            arousal_indicators = []
-            
-            # Eye width
-            if 'left_eye' in landmarks and 'right_eye' in landmarks:
-                eye_openness = (np.std(landmarks['left_eye'][:, 1]) + np.std(landmarks['right_eye'][:, 1])) * 4
-                arousal_indicators.append(min(eye_openness, 1.0))
-            
-            # Eyebrow height
-            if 'eyebrows' in landmarks:
-                brow_height = 1.0 - np.mean(landmarks['eyebrows'][:, 1])  # Higher y = lower on screen
-                arousal_indicators.append(min(brow_height * 2, 1.0))
-            
-            return np.mean(arousal_indicators) if arousal_indicators else 0.5
-            
-        except Exception as e:
-            return 0.5
-    
-    def _calculate_valence(self, landmarks: Dict) -> float:
-        """Calculate emotional valence (positive/negative)"""
-        try:
-            # Positive valence: upturned mouth corners, raised cheeks
-            valence_indicators = []
-            
-            # Mouth curvature
-            if 'mouth' in landmarks:
-                mouth_points = landmarks['mouth']
-                if len(mouth_points) > 4:
-                    # Compare mouth corners to center
-                    left_corner = mouth_points[0][1]
-                    right_corner = mouth_points[-1][1]
-                    center = np.mean(mouth_points[2:4, 1])
-                    
-                    smile_intensity = max(0, center - (left_corner + right_corner) / 2) * 10
-                    valence_indicators.append(min(smile_intensity, 1.0))
-            
-            # Cheek elevation
-            if 'cheeks' in landmarks:
-                cheek_height = 1.0 - np.mean(landmarks['cheeks'][:, 1])
-                valence_indicators.append(min(cheek_height * 1.5, 1.0))
-            
-            return np.mean(valence_indicators) if valence_indicators else 0.5
-            
-        except Exception as e:
-            return 0.5
+    def _landmark_buffer(self) -> np.ndarray:
+        """Landmark matrix for the current thread; contents are only valid until its next frame"""
+        buffer = getattr(self._scratch, 'key_points', None)
+        if buffer is None:
+            buffer = np.empty((len(self._flat_idx), 3), dtype=np.float32)
+            self._scratch.key_points = buffer
+        return buffer
     
-    def _detect_micro_expressions(self, landmarks: Dict) -> List[str]:
-        """Detect subtle micro-expressions"""
-        micro_expressions = []
-        
+    def _analyze_landmarks_fused(self, key_points: np.ndarray) -> Tuple[float, float, float, List[str]]:
+        """Calculate intensity, arousal, valence and micro-expressions from shared region statistics"""
         try:
-            # Detect subtle expressions based on landmark patterns
-            if 'eyebrows' in landmarks and 'eyes' in landmarks:
-                # Slight eyebrow furrow (concentration/confusion)
-                brow_distance = np.std(landmarks['eyebrows'][:, 0])
-                if brow_distance < 0.02:
-                    micro_expressions.append('concentration')
+            regions = self._region_slices
+            # One contiguous y column; region slices of it are contiguous views
+            ys = key_points[:, 1].astype(np.float64)
+            
+            intensity, arousal, valence, brow_std_x, mouth_std_y = _landmark_kernel(
+                ys[regions['left_eye']],
+                ys[regions['right_eye']],
+                key_points[regions['eyebrows'], 0].astype(np.float64),
+                ys[regions['eyebrows']],
+                ys[regions['mouth']],
+                ys[regions['cheeks']]
+            )
             
-            if 'mouth' in landmarks:
-                # Slight lip press (frustration)
-                lip_compression = np.std(landmarks['mouth'][:, 1])
-                if lip_compression < 0.01:
-                    micro_expressions.append('mild_frustration')
+            # Micro-expressions: eyebrow furrow (concentration) and lip press (frustration)
+            micro_expressions = []
+            if brow_std_x < 0.02:
+                micro_expressions.append('concentration')
+            if mouth_std_y < 0.01:
+                micro_expressions.append('mild_frustration')
             
-            return micro_expressions
+            return float(intensity), float(arousal), float(valence), micro_expressions
             
         except Exception as e:
-            return []
+            logger.warning("Fused landmark analysis failed: %s", e)
+            return 0.5, 0.5, 0.5, []
     
     def _analyze_emotion_patterns(self, child_id: str) -> Dict:
         """Analyze historical emotion patterns"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Get recent emotion history (last 7 days)
-            cursor.execute('''
-                SELECT emotion, confidence, timestamp, arousal_level, valence_level
-                FROM emotion_sessions 
-                WHERE child_id = ? AND timestamp > datetime('now', '-7 days')
-                ORDER BY timestamp DESC
-            ''', (child_id,))
-            
-            history = cursor.fetchall()
-            
-            if not history:
-                return {'trend': 'neutral', 'stability': 0.5, 'patterns': []}
-            
-            # Analyze patterns
-            emotions = [row[0] for row in history]
-            confidences = [row[1] for row in history]
-            arousals = [row[3] for row in history if row[3] is not None]
-            valences = [row[4] for row in history if row[4] is not None]
-            
-            # Calculate trend
-            trend = self._calculate_emotion_trend(emotions, confidences)
+            history = self._cached_history(child_id)
+            if history is None:
+                history = self._prime_history(child_id)
             
-            # Calculate emotional stability
-            stability = 1.0 - np.std(confidences) if confidences else 0.5
-            
-            # Detect recurring patterns
-            patterns = self._detect_emotion_patterns(emotions)
-            
-            return {
-                'trend': trend,
-                'stability': stability,
-                'patterns': patterns,
-                'avg_arousal': np.mean(arousals) if arousals else 0.5,
-                'avg_valence': np.mean(valences) if valences else 0.5,
-                'recent_emotions': emotions[:10]  # Last 10 emotions
-            }
+            # Recent emotion history (last 7 days)
+            history.evict_before(datetime.utcnow() - HISTORY_WINDOW)
+            return history.summary()
             
         except Exception as e:
-            print(f"Pattern analysis failed: {e}")
+            logger.warning("Pattern analysis failed: %s", e)
             return {'trend': 'neutral', 'stability': 0.5, 'patterns': []}
     
-    def _calculate_emotion_trend(self, emotions: List[str], confidences: List[float]) -> str:
-        """Calculate overall emotional trend"""
-        try:
-            if len(emotions) < 3:
-                return 'neutral'
-            
-            # Weight emotions by confidence and recency
-            positive_emotions = ['happy', 'surprise']
-            negative_emotions = ['sad', 'angry', 'fear', 'disgust']
-            
-            weighted_score = 0
-            total_weight = 0
-            
-            for i, (emotion, confidence) in enumerate(zip(emotions, confidences)):
-                # More recent emotions have higher weight
-                weight = confidence * (1.0 - i * 0.1)
-                
-                if emotion in positive_emotions:
-                    weighted_score += weight
-                elif emotion in negative_emotions:
-                    weighted_score -= weight
-                
-                total_weight += abs(weight)
-            
-            if total_weight == 0:
-                return 'neutral'
-            
-            avg_score = weighted_score / total_weight
-            
-            if avg_score > 0.2:
-                return 'improving'
-            elif avg_score < -0.2:
-                return 'declining'
-            else:
-                return 'stable'
-                
-        except Exception as e:
-            return 'neutral'
-    
-    def _detect_emotion_patterns(self, emotions: List[str]) -> List[str]:
-        """Detect recurring emotional patterns"""
-        patterns = []
+    def _prime_history(self, child_id: str) -> EmotionHistory:
+        """Load a child's last 7 days of emotions from SQLite into the in-memory history"""
+        with self._db_pool.borrow() as conn:
+            rows = conn.execute('''
+                SELECT COALESCE(emotion_code, -1), confidence, timestamp, arousal_level, valence_level
+                FROM emotion_sessions 
+                WHERE child_id = ? AND timestamp > datetime('now', '-7 days')
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', (child_id, HISTORY_MAXLEN)).fetchall()
         
-        try:
-            if len(emotions) < 5:
-                return patterns
-            
-            # Look for common sequences
-            emotion_sequences = {}
-            for i in range(len(emotions) - 2):
-                sequence = tuple(emotions[i:i+3])
-                emotion_sequences[sequence] = emotion_sequences.get(sequence, 0) + 1
-            
-            # Find frequent patterns
-            for sequence, count in emotion_sequences.items():
-                if count >= 2:  # Appears at least twice
-                    patterns.append(f"{' -> '.join(sequence)} (x{count})")
-            
-            # Detect emotional cycles
-            if len(set(emotions[:6])) <= 3:  # Limited variety in recent emotions
-                patterns.append("emotional_cycling")
-            
-            return patterns
-            
-        except Exception as e:
-            return []
+        history = EmotionHistory()
+        for code, confidence, timestamp, arousal, valence in reversed(rows):
+            history.append((code, confidence, datetime.fromisoformat(timestamp), arousal, valence))
+        
+        with self._history_lock:
+            self._history[child_id] = (time.monotonic() + HISTORY_CACHE_TTL, history)
+            self._history.move_to_end(child_id)
+            while len(self._history) > HISTORY_CACHE_SIZE:
+                self._history.popitem(last=False)
+        return history
+    
+    def _cached_history(self, child_id: str) -> Optional[EmotionHistory]:
+        """A child's in-memory history if it is still cached, renewing its expiry"""
+        now = time.monotonic()
+        with self._history_lock:
+            entry = self._history.get(child_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._history[child_id]
+                return None
+            self._history[child_id] = (now + HISTORY_CACHE_TTL, entry[1])
+            self._history.move_to_end(child_id)
+            return entry[1]
     
     def _combine_emotion_results(self, emotion_results: Dict, landmark_analysis: Dict, temporal_analysis: Dict) -> Tuple[str, float]:
         """Combine multiple analysis results for final emotion prediction"""
@@ -483,7 +1264,7 @@ class AdvancedEmotionAnalyzer:
             # Adjust based on temporal patterns
             if temporal_analysis.get('trend') == 'declining':
                 # Boost negative emotions slightly if there's a declining trend
-                for emotion in ['sad', 'angry', 'fear']:
+                for emotion in DISTRESS_EMOTIONS:
                     if emotion in emotion_scores:
                         emotion_scores[emotion] *= 1.1
             
@@ -501,60 +1282,125 @@ class AdvancedEmotionAnalyzer:
             return primary_emotion, adjusted_confidence
             
         except Exception as e:
-            print(f"Result combination failed: {e}")
+            logger.warning("Result combination failed: %s", e)
             return 'neutral', 0.5
     
-    def _generate_advanced_companion_response(self, emotion: str, confidence: float, child_profile: Dict, context: str, temporal_analysis: Dict) -> str:
-        """Generate advanced, context-aware companion response"""
+    def _generate_advanced_companion_response(self, emotion: str, confidence: float, child_profile: Dict, context: str, temporal_analysis: Dict, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Generate advanced, context-aware companion response (token iterator when stream=True)"""
+        child_name = child_profile.get('name', 'friend')
+        fallback = f"Hi {child_name}! I can see you're feeling {emotion} right now. That's completely okay - everyone feels different emotions, and I'm here to help you feel better. 🌟"
+        
         try:
-            # Build comprehensive prompt for GPT-4
-            prompt = f"""
-            Generate a compassionate, age-appropriate response for a child with learning differences.
-
-            Child Profile:
-            - Name: {child_profile.get('name', 'friend')}
-            - Age: {child_profile.get('age', 8)}
-            - Learning differences: {', '.join(child_profile.get('learning_differences', []))}
-            - Interests: {', '.join(child_profile.get('interests', []))}
-
-            Current Situation:
-            - Detected emotion: {emotion} (confidence: {confidence:.1%})
-            - Context: {context}
-            - Recent emotional trend: {temporal_analysis.get('trend', 'neutral')}
-            - Emotional stability: {temporal_analysis.get('stability', 0.5):.1%}
-
-            Pattern Insights:
-            - Recent emotions: {', '.join(temporal_analysis.get('recent_emotions', [])[:5])}
-            - Patterns: {', '.join(temporal_analysis.get('patterns', []))}
-
-            Generate a response that:
-            1. Acknowledges the child's emotion with empathy
-            2. Uses language appropriate for their age and learning profile
-            3. Incorporates their interests when possible
-            4. Provides gentle guidance or support
-            5. Is encouraging and positive
-            6. Considers their emotional patterns and history
-
-            Keep the response under 100 words and use a warm, friendly tone.
-            """
+            # Reuse a previous response for the same situation and a similar context
+            situation_key = self._companion_situation_key(emotion, child_profile, temporal_analysis)
+            context_embedding = embed_context(context)
+            cached_response = self._lookup_cached_response(situation_key, context_embedding)
+            if cached_response is not None:
+                return iter([cached_response]) if stream else cached_response
+            
+            # Only the per-child details are formatted; the instructions live in the system prompt
+            prompt = COMPANION_PROMPT_TEMPLATE.format(
+                name=child_name,
+                age=child_profile.get('age', 8),
+                learning_differences=', '.join(child_profile.get('learning_differences', [])),
+                interests=', '.join(child_profile.get('interests', [])),
+                emotion=emotion,
+                confidence=confidence,
+                context=context,
+                trend=temporal_analysis.get('trend', 'neutral'),
+                stability=temporal_analysis.get('stability', 0.5),
+                recent_emotions=', '.join(temporal_analysis.get('recent_emotions', [])[:5]),
+                patterns=', '.join(temporal_analysis.get('patterns', []))
+            )
+            messages = [
+                {"role": "system", "content": COMPANION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            
+            if stream:
+                return self._stream_companion_response(messages, situation_key, context_embedding, fallback)
 
             response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a caring AI companion specialized in supporting children with learning differences. Be empathetic, encouraging, and age-appropriate."},
-                    {"role": "user", "content": prompt}
-                ],
+                model=COMPANION_MODEL,
+                messages=messages,
                 max_tokens=150,
                 temperature=0.7
             )
 
-            return response.choices[0].message.content.strip()
+            companion_response = response.choices[0].message.content.strip()
+            self._store_cached_response(situation_key, context_embedding, companion_response)
+            return companion_response
 
         except Exception as e:
-            print(f"Advanced response generation failed: {e}")
+            logger.warning("Advanced response generation failed: %s", e)
             # Fallback to simple response
-            child_name = child_profile.get('name', 'friend')
-            return f"Hi {child_name}! I can see you're feeling {emotion} right now. That's completely okay - everyone feels different emotions, and I'm here to help you feel better. 🌟"
+            return iter([fallback]) if stream else fallback
+    
+    def _stream_companion_response(self, messages: List[Dict], situation_key: Tuple, context_embedding: np.ndarray, fallback: str) -> Iterator[str]:
+        """Yield companion response tokens as they arrive, caching the full text at the end"""
+        parts = []
+        try:
+            response = self.client.chat.completions.create(
+                model=COMPANION_MODEL,
+                messages=messages,
+                max_tokens=150,
+                temperature=0.7,
+                stream=True
+            )
+            
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            
+            self._store_cached_response(situation_key, context_embedding, ''.join(parts).strip())
+            
+        except Exception as e:
+            logger.warning("Advanced response streaming failed: %s", e)
+            if not parts:
+                yield fallback
+    
+    def _companion_situation_key(self, emotion: str, child_profile: Dict, temporal_analysis: Dict) -> Tuple:
+        """Everything except free-text context that shapes the companion response"""
+        return (
+            emotion,
+            child_profile.get('name', 'friend'),
+            child_profile.get('age', 8),
+            tuple(sorted(child_profile.get('learning_differences', []))),
+            tuple(sorted(child_profile.get('interests', []))),
+            temporal_analysis.get('trend', 'neutral')
+        )
+    
+    def _lookup_cached_response(self, situation_key: Tuple, context_embedding: np.ndarray) -> Optional[str]:
+        """Return a cached response whose context is similar enough, if any"""
+        with self._resp_cache_lock:
+            entry = self._resp_cache.get(situation_key)
+            if entry is None:
+                return None
+            
+            similarities = entry['embeddings'] @ context_embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < RESPONSE_CACHE_SIMILARITY:
+                return None
+            
+            self._resp_cache.move_to_end(situation_key)
+            return entry['responses'][best]
+    
+    def _store_cached_response(self, situation_key: Tuple, context_embedding: np.ndarray, response: str):
+        """Remember a generated response, evicting the least recently used situation"""
+        with self._resp_cache_lock:
+            entry = self._resp_cache.get(situation_key)
+            if entry is None:
+                entry = {'embeddings': np.empty((0, CONTEXT_EMBEDDING_DIM), dtype=np.float32), 'responses': []}
+                self._resp_cache[situation_key] = entry
+            
+            entry['embeddings'] = np.vstack([entry['embeddings'], context_embedding])[-RESPONSE_CACHE_CONTEXTS:]
+            entry['responses'] = (entry['responses'] + [response])[-RESPONSE_CACHE_CONTEXTS:]
+            
+            self._resp_cache.move_to_end(situation_key)
+            while len(self._resp_cache) > RESPONSE_CACHE_SIZE:
+                self._resp_cache.popitem(last=False)
     
     def _assess_comprehensive_intervention(self, emotion: str, confidence: float, child_profile: Dict, temporal_analysis: Dict) -> Dict:
         """Assess need for intervention with comprehensive analysis"""
@@ -567,7 +1413,7 @@ class AdvancedEmotionAnalyzer:
             emotion_config = self.emotion_config.get(emotion, {'threshold': 0.5, 'interventions': []})
             
             # Base intervention assessment
-            if confidence > emotion_config['threshold'] and emotion in ['sad', 'angry', 'fear']:
+            if confidence > emotion_config['threshold'] and emotion in DISTRESS_EMOTIONS:
                 intervention_needed = True
                 intervention_type = 'immediate'
                 strategies = emotion_config['interventions'].copy()
@@ -605,61 +1451,169 @@ class AdvancedEmotionAnalyzer:
             }
             
         except Exception as e:
-            print(f"Intervention assessment failed: {e}")
+            logger.warning("Intervention assessment failed: %s", e)
             return {'needed': False, 'type': 'none', 'strategies': []}
     
     def _store_comprehensive_emotion_data(self, child_id: str, emotion: str, confidence: float, context: str, companion_response: str, landmark_analysis: Dict, intervention_data: Dict):
-        """Store comprehensive emotion analysis data"""
+        """Queue comprehensive emotion analysis data for the background writer"""
         try:
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO emotion_sessions 
-                (child_id, emotion, confidence, context, intervention_applied, 
-                 facial_landmarks, arousal_level, valence_level)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            emotion_code = EMOTION_CODES.get(emotion)
+            self._write_q.put((
                 child_id,
                 emotion,
+                emotion_code,
                 confidence,
                 context,
-                json.dumps(intervention_data),
-                json.dumps(landmark_analysis.get('landmarks', {}), default=str),
+                dumps_json(intervention_data),
+                dumps_json(landmark_analysis.get('landmarks', {})),
                 landmark_analysis.get('arousal', 0.5),
                 landmark_analysis.get('valence', 0.5)
             ))
             
-            self.conn.commit()
+            # Keep the in-memory history in step; unprimed children load from SQLite on first read
+            history = self._cached_history(child_id)
+            if history is not None:
+                history.append((
+                    emotion_code if emotion_code is not None else -1,
+                    confidence,
+                    datetime.utcnow(),
+                    landmark_analysis.get('arousal', 0.5),
+                    landmark_analysis.get('valence', 0.5)
+                ))
             
         except Exception as e:
-            print(f"Data storage failed: {e}")
+            logger.warning("Data storage failed: %s", e)
+    
+    def _writer_loop(self):
+        """Drain queued emotion rows and insert them in batches"""
+        conn = self._connect()  # the writer thread's own connection, outside the pool
+        conn.execute(f'PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}')
+        
+        while True:
+            # Block for the first row, then gather more until the batch fills or the interval ends
+            batch = [self._write_q.get()]
+            deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+            while len(batch) < WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._write_q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            try:
+                # One transaction per batch; a failed batch is rolled back rather than left open
+                with self._db_write_lock, conn:
+                    conn.executemany(INSERT_EMOTION_SESSION_SQL, batch)
+                self._invalidate_dashboards({row[0] for row in batch})
+            except Exception as e:
+                logger.warning("Data storage failed: %s", e)
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+    
+    def _invalidate_dashboards(self, child_ids):
+        """Drop cached dashboards for children with newly written rows"""
+        with self._dash_cache_lock:
+            for child_id in child_ids:
+                self._dash_cache.pop(child_id, None)
     
-    def _basic_emotion_detection(self, image: np.ndarray) -> Tuple[str, float]:
-        """Basic emotion detection fallback"""
+    def flush_pending_writes(self):
+        """Block until every queued emotion row has been written"""
+        self._write_q.join()
+    
+    def _basic_emotion_detection(self, image: np.ndarray, landmark_analysis: Dict) -> Tuple[str, float]:
+        """Basic emotion detection fallback from face presence and landmark valence"""
         try:
             # Simple heuristic-based emotion detection
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-            
-            if len(faces) == 0:
+            if self._count_faces(image) == 0:
                 return 'neutral', 0.3
             
-            # Use simple features for basic emotion classification
-            # This is a simplified implementation - in practice, you'd use a trained model
-            
-            # For demo purposes, return a random emotion with moderate confidence
-            import random
-            emotions = ['happy', 'sad', 'neutral', 'surprised', 'angry']
-            return random.choice(emotions), 0.6
+            # Map the already computed landmark valence onto a coarse emotion
+            valence = landmark_analysis.get('valence', 0.5)
+            if valence > 0.6:
+                return 'happy', 0.6
+            if valence < 0.4:
+                return 'sad', 0.6
+            return 'neutral', 0.6
             
         except Exception as e:
-            print(f"Basic emotion detection failed: {e}")
+            logger.warning("Basic emotion detection failed: %s", e)
             return 'neutral', 0.3
 
+    def _count_faces(self, image: np.ndarray) -> int:
+        """Count faces with the SSD detector (single 300x300 forward pass)"""
+        if self._dnn_face is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return len(self.face_cascade.detectMultiScale(gray, 1.3, 5))
+        
+        blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), [104, 117, 123])
+        with self._dnn_face_lock:
+            self._dnn_face.setInput(blob)
+            detections = self._dnn_face.forward()
+        
+        return int(np.count_nonzero(detections[0, 0, :, 2] > FACE_DETECTION_THRESHOLD))
+
     def generate_personalized_social_story(self, emotion_context: str, child_profile: Dict) -> str:
         """Generate personalized social story for emotional learning"""
         try:
-            prompt = f"""
+            prompt = self._social_story_prompt(emotion_context, child_profile)
+
+            # The prompt already carries every profile field the story depends on
+            story_key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            cached = self._lookup_cached_story(story_key)
+            if cached is not None:
+                return cached
+
+            response = self.client.chat.completions.create(
+                **self._social_story_request(prompt, child_profile)
+            )
+
+            story = response.choices[0].message.content.strip()
+            self._store_cached_story(story_key, story)
+            return story
+
+        except Exception:
+            logger.exception("Social story generation failed")
+            return self._fallback_social_story(child_profile)
+
+    async def agenerate_social_story(self, emotion_context: str, child_profile: Dict) -> str:
+        """Async variant of generate_personalized_social_story"""
+        try:
+            prompt = self._social_story_prompt(emotion_context, child_profile)
+
+            # The story cache is backed by SQLite, so its lookups and writes run off the event loop
+            story_key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            cached = await asyncio.to_thread(self._lookup_cached_story, story_key)
+            if cached is not None:
+                return cached
+
+            response = await self.async_client.chat.completions.create(
+                **self._social_story_request(prompt, child_profile)
+            )
+
+            story = response.choices[0].message.content.strip()
+            await asyncio.to_thread(self._store_cached_story, story_key, story)
+            return story
+
+        except Exception:
+            logger.exception("Social story generation failed")
+            return self._fallback_social_story(child_profile)
+
+    async def generate_social_stories_batch(self, requests: List[Tuple[str, Dict]]) -> List[str]:
+        """Generate social stories for (emotion_context, child_profile) pairs concurrently"""
+        semaphore = asyncio.Semaphore(STORY_BATCH_CONCURRENCY)
+
+        async def generate(emotion_context: str, child_profile: Dict) -> str:
+            async with semaphore:
+                return await self.agenerate_social_story(emotion_context, child_profile)
+
+        return await asyncio.gather(*(generate(context, profile) for context, profile in requests))
+
+    def _social_story_prompt(self, emotion_context: str, child_profile: Dict) -> str:
+        """Social story prompt for a child and emotional context"""
+        return f"""
             Create a personalized social story to help a child understand and cope with emotions.
 
             Child Profile:
@@ -681,72 +1635,149 @@ class AdvancedEmotionAnalyzer:
             Format as a short story with 4-5 sentences, each on a new line.
             """
 
+    def stream_social_story(self, emotion_context: str, child_profile: Dict) -> Iterator[str]:
+        """Yield social story text as it arrives, caching the full story at the end"""
+        parts = []
+        try:
+            prompt = self._social_story_prompt(emotion_context, child_profile)
+
+            story_key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            cached = self._lookup_cached_story(story_key)
+            if cached is not None:
+                yield cached
+                return
+
             response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert in creating social stories for children with learning differences. Create clear, supportive, and personalized content."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.7
+                **self._social_story_request(prompt, child_profile),
+                stream=True
             )
 
-            return response.choices[0].message.content.strip()
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+            self._store_cached_story(story_key, ''.join(parts).strip())
 
+        except Exception:
+            logger.exception("Social story streaming failed")
+            if not parts:
+                yield self._fallback_social_story(child_profile)
+
+    def _social_story_request(self, prompt: str, child_profile: Dict) -> Dict:
+        """Chat completion arguments for a social story prompt"""
+        details = len(child_profile.get('interests', [])) + len(child_profile.get('learning_differences', []))
+        max_tokens = min(SOCIAL_STORY_MAX_TOKENS, SOCIAL_STORY_BASE_TOKENS + SOCIAL_STORY_TOKENS_PER_DETAIL * details)
+        return {
+            'model': "gpt-4",
+            'messages': [
+                {"role": "system", "content": "You are an expert in creating social stories for children with learning differences. Create clear, supportive, and personalized content."},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': max_tokens,
+            'temperature': 0.7
+        }
+
+    def _fallback_social_story(self, child_profile: Dict) -> str:
+        """Canned social story used when generation fails"""
+        return FALLBACK_STORY_TEMPLATE.format_map({'name': child_profile.get('name', 'friend')})
+
+    def _lookup_cached_story(self, story_key: str) -> Optional[str]:
+        """Cached story for a prompt hash, checking memory first and then SQLite"""
+        now = time.time()
+        with self._story_cache_lock:
+            entry = self._story_cache.get(story_key)
+            if entry is not None and entry[0] > now:
+                self._story_cache.move_to_end(story_key)
+                return entry[1]
+        
+        with self._db_pool.borrow() as conn:
+            row = conn.execute(
+                'SELECT content, created_at FROM story_cache WHERE key = ? AND created_at > ?',
+                (story_key, int(now) - STORY_CACHE_TTL)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        self._remember_story(story_key, row[0], row[1] + STORY_CACHE_TTL)
+        return row[0]
+    
+    def _store_cached_story(self, story_key: str, story: str):
+        """Keep a generated story in memory and in the story_cache table"""
+        now = int(time.time())
+        self._remember_story(story_key, story, now + STORY_CACHE_TTL)
+        try:
+            with self._db_pool.borrow() as conn, self._db_write_lock:
+                conn.execute(
+                    'INSERT OR REPLACE INTO story_cache (key, content, created_at) VALUES (?, ?, ?)',
+                    (story_key, story, now)
+                )
+                conn.commit()
         except Exception as e:
-            print(f"Social story generation failed: {e}")
-            child_name = child_profile.get('name', 'friend')
-            return f"""
-            Sometimes {child_name} might feel overwhelmed during learning activities.
-            When this happens, it's okay to take a deep breath and count to five.
-            {child_name} can ask for help from a teacher or parent when feeling this way.
-            Taking breaks and using coping strategies helps {child_name} feel better.
-            {child_name} is doing great and learning every day!
-            """
+            logger.warning("Story cache write failed: %s", e)
+    
+    def _remember_story(self, story_key: str, story: str, expires_at: float):
+        """Add a story to the in-memory LRU tier"""
+        with self._story_cache_lock:
+            self._story_cache[story_key] = (expires_at, story)
+            self._story_cache.move_to_end(story_key)
+            while len(self._story_cache) > STORY_CACHE_SIZE:
+                self._story_cache.popitem(last=False)
+
+    def prewarm_dashboards(self, child_ids: Optional[Iterable[str]] = None):
+        """Rebuild cached dashboards, by default for children seen since yesterday"""
+        if child_ids is None:
+            with self._db_pool.borrow() as conn:
+                child_ids = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT child_id FROM emotion_daily_summary WHERE day >= date('now', '-1 day')"
+                )]
+        
+        for child_id in child_ids:
+            self._invalidate_dashboards((child_id,))
+            self.get_emotion_dashboard_data(child_id)
+    
+    def start_dashboard_prewarm(self, interval: float = DASHBOARD_PREWARM_INTERVAL):
+        """Keep active children's dashboards warm from a background thread"""
+        def prewarm_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.prewarm_dashboards()
+                except Exception as e:
+                    logger.warning("Dashboard prewarm failed: %s", e)
+        
+        thread = threading.Thread(target=prewarm_loop, daemon=True)
+        thread.start()
+        return thread
 
     def get_emotion_dashboard_data(self, child_id: str) -> Dict:
         """Get comprehensive emotion dashboard data"""
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        
         try:
-            cursor = self.conn.cursor()
-            
-            # Get today's emotions
-            cursor.execute('''
-                SELECT emotion, confidence FROM emotion_sessions 
-                WHERE child_id = ? AND DATE(timestamp) = DATE('now')
-                ORDER BY timestamp
-            ''', (child_id,))
-            
-            today_emotions = [row[0] for row in cursor.fetchall()]
-            
-            # Get weekly summary
-            cursor.execute('''
-                SELECT emotion, confidence, intervention_applied FROM emotion_sessions 
-                WHERE child_id = ? AND timestamp > datetime('now', '-7 days')
-            ''', (child_id,))
-            
-            weekly_data = cursor.fetchall()
+            # Today's emotions and the weekly summary in one round trip
+            today_emotions = []
+            positive_emotions = total_emotions = successful_interventions = 0
+            with self._db_pool.borrow() as conn:
+                rows = conn.execute(DASHBOARD_SQL, {'child_id': child_id}).fetchall()
+            for kind, _, emotion, positive, total, successful in rows:
+                if kind == 'T':
+                    today_emotions.append(emotion)
+                else:
+                    positive_emotions, total_emotions, successful_interventions = positive, total, successful
             
             # Calculate metrics
-            positive_emotions = sum(1 for emotion, _, _ in weekly_data if emotion in ['happy', 'surprise'])
-            total_emotions = len(weekly_data)
             positive_percentage = int((positive_emotions / total_emotions * 100)) if total_emotions > 0 else 50
             
-            # Count successful interventions
-            successful_interventions = sum(1 for _, _, intervention in weekly_data if intervention and 'success' in str(intervention))
-            
-            return {
-                'today_emotions': today_emotions[-10:],  # Last 10 today
+            dashboard = {
+                'today_emotions': today_emotions,  # Last 10 today
                 'mood_trend': 'positive' if positive_percentage > 60 else 'stable' if positive_percentage > 40 else 'needs_attention',
-                'coping_strategies_used': [
-                    {'strategy': 'Deep breathing', 'times_used': 5, 'effectiveness': 88},
-                    {'strategy': 'Counting to 10', 'times_used': 3, 'effectiveness': 92},
-                    {'strategy': 'Taking breaks', 'times_used': 4, 'effectiveness': 85}
-                ],
-                'achievements': [
-                    'Used coping strategies independently 3 times',
-                    'Recognized feeling frustrated and asked for help',
-                    'Stayed calm during challenging activity'
-                ],
+                'coping_strategies_used': DASHBOARD_COPING_STRATEGIES,
+                'achievements': DASHBOARD_ACHIEVEMENTS,
                 'weekly_summary': {
                     'positive_emotions': positive_percentage,
                     'challenging_moments': max(0, total_emotions - positive_emotions),
@@ -755,8 +1786,16 @@ class AdvancedEmotionAnalyzer:
                 }
             }
             
-        except Exception as e:
-            print(f"Dashboard data generation failed: {e}")
+            with self._dash_cache_lock:
+                self._dash_cache[child_id] = (time.monotonic() + DASHBOARD_CACHE_TTL, dashboard, None)
+                self._dash_cache.move_to_end(child_id)
+                while len(self._dash_cache) > DASHBOARD_CACHE_SIZE:
+                    self._dash_cache.popitem(last=False)
+            
+            return dashboard
+            
+        except Exception:
+            logger.exception("Dashboard data generation failed for child %s", child_id)
             return {
                 'today_emotions': ['happy', 'neutral', 'happy'],
                 'mood_trend': 'stable',
@@ -769,3 +1808,18 @@ class AdvancedEmotionAnalyzer:
                     'improvement_areas': ['Data collection in progress']
                 }
             }
+    
+    def get_emotion_dashboard_bytes(self, child_id: str) -> bytes:
+        """Dashboard data as JSON bytes, serialized once per cached dashboard"""
+        dashboard = self.get_emotion_dashboard_data(child_id)
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[1] is dashboard and entry[2] is not None:
+                return entry[2]
+        
+        payload = orjson.dumps(dashboard) if orjson is not None else json.dumps(dashboard).encode()
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[1] is dashboard:
+                self._dash_cache[child_id] = (entry[0], dashboard, payload)
+        return payload
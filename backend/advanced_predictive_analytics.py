@@ -7,45 +7,362 @@ import numpy as np
 import pandas as pd
 import sqlite3
 import json
-import openai
 import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, is_dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+# sklearn (and skl2onnx) are imported inside the training methods; serving only needs the fitted models
+try:
+    import onnxruntime as ort
+except ImportError:
+    # ONNX serving is optional; trajectory models fall back to sklearn predict
+    ort = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional; the kernels below run as plain Python without it
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+    prange = range
+
+try:
+    import lz4  # noqa: F401  (enables joblib's lz4 compressor)
+    MODEL_COMPRESSION = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESSION = ('zlib', 3)
+
+# Fitted models are cached on disk, keyed on the estimator's hyperparameters and the training data
+TRAINING_CACHE_DIR = '.cache_analytics'
+training_memory = joblib.Memory(TRAINING_CACHE_DIR, mmap_mode='r', verbose=0)
+
+
+@training_memory.cache
+def fit_estimator(estimator, X: np.ndarray, y: np.ndarray):
+    """Fit an unfitted estimator, reusing the cached fit for identical parameters and data"""
+    return estimator.fit(X, y)
+
+
+def grouped_slope(n, sum_t, sum_y, sum_tt, sum_ty):
+    """Least-squares slope of y against t = 0..n-1 from per-group sums"""
+    return (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+
+
+# Response timestamps are shared at this resolution instead of formatting datetime.now() per field
+CLOCK_RESOLUTION = 0.1
+NEXT_ASSESSMENT_INTERVAL = timedelta(weeks=2)
+
+
+class CoarseClock:
+    """Wall-clock time and its ISO string, recomputed at most once per resolution interval"""
+    
+    def __init__(self, resolution: float = CLOCK_RESOLUTION):
+        self.resolution = resolution
+        self._state = (0.0, None, '')
+    
+    def _tick(self) -> Tuple[float, datetime, str]:
+        """Current (expiry, datetime, iso) state, refreshed once it has expired"""
+        state = self._state
+        if state[0] <= time.monotonic():
+            now = datetime.now()
+            # A single tuple assignment, so readers never see a half-updated clock
+            state = self._state = (time.monotonic() + self.resolution, now, now.isoformat())
+        return state
+    
+    def now(self) -> datetime:
+        """Cached datetime.now()"""
+        return self._tick()[1]
+    
+    def iso(self) -> str:
+        """Cached datetime.now().isoformat()"""
+        return self._tick()[2]
+
+
+clock = CoarseClock()
+
+
+# Intervention timing and type by urgency bucket (performance >= 85, < 85, < 75, < 60)
+INTERVENTION_TIMINGS = ('continue_monitoring', 'within_month', 'within_2_weeks', 'immediate')
+INTERVENTION_TYPES = ('none', 'skill_reinforcement', 'targeted_practice', 'intensive_support')
+INTERVENTION_NEEDED_BUCKET = 2
+IMPROVEMENT_TEMPLATE = '+%d points in 6-8 weeks'
+PREVALENCE_TEMPLATE = '%.1f%%'
+
+# Demo metrics are drawn in one call per response
+rng = np.random.default_rng()
+
+# Frontend polls reuse a child's dashboard for up to a minute
+DASHBOARD_CACHE_SIZE = 1024
+DASHBOARD_CACHE_TTL = 60
+
+# Demo (current, trend, prediction) ranges per dashboard area, upper bounds exclusive
+DASHBOARD_TREND_AREAS = ('reading', 'math', 'focus', 'social')
+DASHBOARD_TREND_LOW = np.array([[70, 8, 78], [65, 5, 72], [75, 3, 80], [68, 10, 75]])
+DASHBOARD_TREND_HIGH = np.array([[85, 15, 88], [80, 12, 85], [90, 8, 92], [82, 18, 88]])
+
+# Demo overall success rate and average improvement ranges
+POPULATION_METRIC_LOW = np.array([82, 18])
+POPULATION_METRIC_HIGH = np.array([89, 25])
+
+
+# Explicit signature: compiled (or loaded from cache) at import so the first request doesn't pay for it
+@njit('Tuple((int64[:], int64[:]))(float64[:], float64, float64[:])', cache=True, parallel=True)
+def intervention_scores(performances, adjustment, uniform):
+    """Urgency bucket (0-3) and expected improvement points for each performance score"""
+    n = performances.shape[0]
+    buckets = np.empty(n, dtype=np.int64)
+    points = np.empty(n, dtype=np.int64)
+    for i in prange(n):
+        performance = performances[i]
+        buckets[i] = (performance < 85) + (performance < 75) + (performance < 60)
+        # Base improvement is uniform in [0.15, 0.35) of the remaining headroom
+        points[i] = int((0.15 + uniform[i] * 0.2) * adjustment * (100 - performance))
+    return buckets, points
+
+
+def dumps_json_bytes(obj) -> bytes:
+    """Serialize a response to JSON bytes, handling NumPy values natively when orjson is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+def _json_default(o):
+    """Fallback encoder for values the stdlib json module does not handle"""
+    if isinstance(o, (np.ndarray, np.generic)):
+        return o.tolist()
+    if is_dataclass(o):
+        return asdict(o)
+    return str(o)
+
+
+# Static demo content shared by every insights/dashboard response; treat as read-only
+MOCK_CURRENT_LEVELS = (
+    ('Reading Fluency', 72),
+    ('Math Computation', 65),
+    ('Attention Span', 78),
+    ('Social Skills', 68)
+)
+MOCK_KEY_FACTORS = (
+    'Consistent practice schedule',
+    'Adaptive difficulty levels',
+    'Positive reinforcement',
+    'Multi-sensory learning approaches'
+)
+MOST_EFFECTIVE_INTERVENTIONS = (
+    {'name': 'Reading Fluency Support', 'success_rate': 87},
+    {'name': 'Math Problem-Solving Strategies', 'success_rate': 84},
+    {'name': 'Attention Training Programs', 'success_rate': 81},
+    {'name': 'Social Skills Development', 'success_rate': 79}
+)
+POPULATION_KEY_FINDINGS = (
+    'Early intervention (ages 6-8) shows 23% higher success rates',
+    'Multi-modal learning approaches increase engagement by 34%',
+    'Parent involvement correlates with 28% better outcomes',
+    'Peer support programs reduce behavioral challenges by 41%'
+)
+POPULATION_RECOMMENDATIONS = (
+    'Implement universal screening for learning differences',
+    'Increase professional development for teachers',
+    'Expand parent education and support programs',
+    'Develop peer mentorship programs'
+)
+POPULATION_TRENDS = {
+    'identification_rate_change': '+12% over past year',
+    'intervention_effectiveness_trend': 'improving',
+    'resource_utilization': '78% optimal',
+    'family_satisfaction': '91% positive'
+}
+LEARNING_PATTERNS = {
+    'best_learning_time': 'Morning (9-11 AM)',
+    'optimal_session_length': '15-20 minutes',
+    'engagement_drivers': (
+        'Visual content and graphics',
+        'Interactive games and activities',
+        'Immediate positive feedback',
+        'Choice in learning activities'
+    ),
+    'challenge_areas': (
+        'Complex multi-step instructions',
+        'Extended focus requirements',
+        'Transition between activities'
+    )
+}
+INTERVENTION_RECOMMENDATIONS = (
+    {
+        'area': 'Reading Fluency',
+        'recommendation': 'Increase daily reading practice to 20 minutes with age-appropriate books',
+        'expected_impact': '+15% improvement in 6 weeks',
+        'priority': 'high'
+    },
+    {
+        'area': 'Attention Span',
+        'recommendation': 'Implement movement breaks every 15 minutes during learning sessions',
+        'expected_impact': '+20% sustained attention',
+        'priority': 'medium'
+    },
+    {
+        'area': 'Math Problem Solving',
+        'recommendation': 'Use visual manipulatives and step-by-step problem breakdown',
+        'expected_impact': '+12% accuracy improvement',
+        'priority': 'medium'
+    }
+)
+MILESTONE_PREDICTIONS = (
+    {
+        'skill': 'Reading grade level',
+        'current': '2.1',
+        'predicted': '2.5 by December'
+    },
+    {
+        'skill': 'Math facts fluency',
+        'current': '65%',
+        'predicted': '80% by November'
+    },
+    {
+        'skill': 'Independent task completion',
+        'current': '70%',
+        'predicted': '85% by January'
+    }
+)
+
+INSERT_LEARNING_SESSION_SQL = '''
+    INSERT INTO learning_sessions 
+    (child_id, session_date, subject, skill_area, performance_score, 
+     time_spent, difficulty_level, engagement_score, mistakes_count, hints_used)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+# Trajectory feature vector: 11 performance/engagement/profile features + 4 learning-difference flags
+TRAJECTORY_FEATURE_COUNT = 15
+
+
+def slope_weights(n: int) -> np.ndarray:
+    """Weights w such that w @ y is the least-squares slope of y against 0..n-1"""
+    x = np.arange(n, dtype=float)
+    x -= x.mean()
+    return x / (x @ x)
+
+
+# Request-time trends use at most the last five scores
+SLOPE_WEIGHTS = {n: slope_weights(n) for n in range(2, 6)}
+
+
+def linear_slope(y) -> float:
+    """Least-squares slope of y against its index, same as np.polyfit(range(len(y)), y, 1)[0]"""
+    weights = SLOPE_WEIGHTS.get(len(y))
+    if weights is None:
+        weights = slope_weights(len(y))
+    return float(weights @ np.asarray(y, dtype=float))
+
+
+class ConstantRegressor:
+    """Fallback regressor that predicts the same value for every row"""
+    
+    def __init__(self, value: float):
+        self.value = value
+    
+    def predict(self, X) -> np.ndarray:
+        return np.full(len(X), self.value)
+
+
+class ConstantClassifier:
+    """Fallback binary classifier with a fixed positive-class probability"""
+    
+    def __init__(self, probability: float):
+        self.probability = probability
+    
+    def predict_proba(self, X) -> np.ndarray:
+        return np.tile([1 - self.probability, self.probability], (len(X), 1))
+    
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+@dataclass
+class InterventionAssessment:
+    """Intervention timing recommendation for one skill; serialized as an object by jsonify and orjson"""
+    __slots__ = ('skill', 'current_performance', 'intervention_needed', 'optimal_timing',
+                 'intervention_type', 'expected_improvement', 'confidence')
+    skill: str
+    current_performance: float
+    intervention_needed: bool
+    optimal_timing: str
+    intervention_type: str
+    expected_improvement: str
+    confidence: float
+
+
 class AdvancedPredictiveLearningAnalytics:
     """
     Advanced ML-powered analytics for learning trajectory prediction and intervention optimization
     """
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # OpenAI client is created on first use; local prediction never needs it
+        self._client = None
         
         # Initialize ML models
         self.trajectory_models = {}
         self.intervention_models = {}
         self.population_models = {}
         
+        # Set when training failed and the models are constants; predictions then use the demo path
+        self.fallback_models = False
+        
+        # ONNX Runtime sessions for the trajectory models, keyed by subject
+        self.onnx_sessions = {}
+        
         # Initialize scalers and encoders
         self.scalers = {}
         self.encoders = {}
         
+        # Recently built analytics dashboards: child_id -> (expiry, dashboard, json bytes or None)
+        self._dash_cache: OrderedDict = OrderedDict()
+        self._dash_cache_lock = threading.Lock()
+        
         # Initialize database
         self.init_database()
         
         # Load or train models
         self.load_or_train_models()
         
+    @property
+    def client(self):
+        """OpenAI client, created on first access"""
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+    
     def init_database(self):
         """Initialize analytics database"""
-        self.conn = sqlite3.connect('learning_analytics.db', check_same_thread=False)
+        self.conn = sqlite3.connect('learning_analytics.db', check_same_thread=False, cached_statements=256)
+        # Close the connection when the analytics object is collected (or at interpreter exit)
+        self._finalizer = weakref.finalize(self, self.conn.close)
+        self.conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA cache_size=-64000;
+            PRAGMA temp_store=MEMORY;
+        ''')
         cursor = self.conn.cursor()
         
         # Learning sessions table
@@ -113,16 +430,38 @@ class AdvancedPredictiveLearningAnalytics:
             )
         ''')
         
+        # Per-child history lookups
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_sessions_child_date ON learning_sessions(child_id, session_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_interventions_child_date ON interventions(child_id, intervention_date)')
+        
         self.conn.commit()
+        
+        # Session inserts reuse one cursor; the lock keeps writers from sharing it concurrently
+        self._insert_cursor = self.conn.cursor()
+        self._db_write_lock = threading.Lock()
     
     def load_or_train_models(self):
         """Load existing models or train new ones"""
         try:
             # Try to load existing models
-            self.trajectory_models['reading'] = joblib.load('models/reading_trajectory_model.pkl')
-            self.trajectory_models['math'] = joblib.load('models/math_trajectory_model.pkl')
-            self.intervention_models['timing'] = joblib.load('models/intervention_timing_model.pkl')
-            self.population_models['success_predictor'] = joblib.load('models/population_success_model.pkl')
+            # Each file bundles a model with its scaler (None for the tree models)
+            for subject in ['reading', 'math']:
+                bundle = joblib.load(f'models/{subject}_trajectory.pkl')
+                self.trajectory_models[subject] = bundle['model']
+                if bundle['scaler'] is not None:
+                    self.scalers[f'trajectory_{subject}'] = bundle['scaler']
+            
+            bundle = joblib.load('models/intervention_timing.pkl')
+            self.intervention_models['timing'] = bundle['model']
+            if bundle['scaler'] is not None:
+                self.scalers['intervention_timing'] = bundle['scaler']
+            
+            self.population_models['success_predictor'] = joblib.load('models/population_success.pkl')['model']
+            
+            for subject in ['reading', 'math']:
+                onnx_path = f'models/{subject}_trajectory_model.onnx'
+                if ort is not None and os.path.exists(onnx_path):
+                    self.onnx_sessions[subject] = self._load_onnx_session(onnx_path)
             
             print("Loaded existing ML models")
             
@@ -154,104 +493,92 @@ class AdvancedPredictiveLearningAnalytics:
     
     def _generate_synthetic_training_data(self) -> Dict[str, pd.DataFrame]:
         """Generate synthetic training data for model development"""
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         
         # Generate synthetic learning session data
         n_sessions = 10000
         n_children = 500
         
-        children_data = []
-        sessions_data = []
-        interventions_data = []
-        
-        # Generate children profiles
-        for i in range(n_children):
-            child_id = f"child_{i}"
-            age = np.random.randint(6, 12)
-            learning_differences = np.random.choice(['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia', 'None'], 
-                                                  p=[0.15, 0.2, 0.1, 0.1, 0.45])
-            baseline_ability = np.random.normal(50, 15)
-            
-            children_data.append({
-                'child_id': child_id,
-                'age': age,
-                'learning_differences': learning_differences,
-                'baseline_ability': baseline_ability
-            })
-        
-        children_df = pd.DataFrame(children_data)
-        
-        # Generate learning sessions
-        for i in range(n_sessions):
-            child = children_df.sample(1).iloc[0]
-            child_id = child['child_id']
-            
-            # Session parameters
-            session_date = datetime.now() - timedelta(days=np.random.randint(0, 365))
-            subject = np.random.choice(['reading', 'math', 'writing', 'science'])
-            skill_area = np.random.choice(['phonics', 'comprehension', 'arithmetic', 'problem_solving'])
-            
-            # Performance influenced by child characteristics
-            base_performance = child['baseline_ability']
-            if child['learning_differences'] != 'None':
-                base_performance -= np.random.normal(5, 3)
-            
-            # Add learning progression over time
-            days_since_start = (datetime.now() - session_date).days
-            progression = min(days_since_start * 0.02, 20)  # Gradual improvement
-            
-            performance_score = max(0, min(100, base_performance + progression + np.random.normal(0, 8)))
-            
-            sessions_data.append({
-                'child_id': child_id,
-                'session_date': session_date.date(),
-                'subject': subject,
-                'skill_area': skill_area,
-                'performance_score': performance_score,
-                'time_spent': np.random.randint(10, 60),
-                'difficulty_level': np.random.randint(1, 5),
-                'engagement_score': np.random.uniform(0.3, 1.0),
-                'mistakes_count': np.random.poisson(3),
-                'hints_used': np.random.poisson(2)
-            })
-        
-        sessions_df = pd.DataFrame(sessions_data)
+        # Generate children profiles; integer ids and a categorical learning difference keep
+        # the session/intervention merges and groupbys on fixed-width keys
+        learning_difference_types = ['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia', 'None']
+        children_df = pd.DataFrame({
+            'child_id': np.arange(n_children, dtype=np.int32),
+            'age': rng.integers(6, 12, n_children, dtype=np.int8),
+            'learning_differences': pd.Categorical.from_codes(
+                rng.choice(len(learning_difference_types), n_children, p=[0.15, 0.2, 0.1, 0.1, 0.45]),
+                categories=learning_difference_types
+            ),
+            'baseline_ability': rng.normal(50, 15, n_children)
+        })
+        
+        # Generate learning sessions, all columns drawn at once
+        child_idx = rng.integers(0, n_children, n_sessions)
+        days_ago = rng.integers(0, 365, n_sessions)
+        # Dates stay datetime64[ns] (midnight) so later comparisons are integer compares, not re-parses
+        session_dates = (pd.Timestamp.now() - pd.to_timedelta(days_ago, unit='D')).normalize()
+        
+        # Performance influenced by child characteristics
+        base_performance = children_df['baseline_ability'].values[child_idx]
+        has_difference = children_df['learning_differences'].values[child_idx] != 'None'
+        base_performance = base_performance - has_difference * rng.normal(5, 3, n_sessions)
+        
+        # Add learning progression over time
+        progression = np.minimum(days_ago * 0.02, 20)  # Gradual improvement
+        
+        performance_score = np.clip(base_performance + progression + rng.normal(0, 8, n_sessions), 0, 100)
+        
+        sessions_df = pd.DataFrame({
+            'child_id': children_df['child_id'].values[child_idx],
+            'session_date': session_dates,
+            'subject': rng.choice(['reading', 'math', 'writing', 'science'], n_sessions),
+            'skill_area': rng.choice(['phonics', 'comprehension', 'arithmetic', 'problem_solving'], n_sessions),
+            'performance_score': performance_score,
+            'time_spent': rng.integers(10, 60, n_sessions),
+            'difficulty_level': rng.integers(1, 5, n_sessions),
+            'engagement_score': rng.uniform(0.3, 1.0, n_sessions),
+            'mistakes_count': rng.poisson(3, n_sessions),
+            'hints_used': rng.poisson(2, n_sessions)
+        })
         
         # Generate intervention data
-        for i in range(1000):  # 1000 interventions
-            child = children_df.sample(1).iloc[0]
-            child_id = child['child_id']
-            
-            intervention_date = datetime.now() - timedelta(days=np.random.randint(30, 300))
-            intervention_type = np.random.choice(['reading_support', 'math_tutoring', 'attention_training', 'social_skills'])
-            
-            # Get child's sessions before intervention
-            child_sessions = sessions_df[
-                (sessions_df['child_id'] == child_id) & 
-                (pd.to_datetime(sessions_df['session_date']) < intervention_date)
-            ]
-            
-            if len(child_sessions) > 0:
-                pre_score = child_sessions['performance_score'].mean()
-                
-                # Intervention effectiveness (varies by type and child)
-                effectiveness = np.random.uniform(0.1, 0.4)
-                if child['learning_differences'] != 'None':
-                    effectiveness *= 1.2  # More effective for children with learning differences
-                
-                post_score = min(100, pre_score + effectiveness * (100 - pre_score))
-                
-                interventions_data.append({
-                    'child_id': child_id,
-                    'intervention_date': intervention_date.date(),
-                    'intervention_type': intervention_type,
-                    'pre_intervention_score': pre_score,
-                    'post_intervention_score': post_score,
-                    'intervention_duration': np.random.randint(2, 12),  # weeks
-                    'effectiveness_score': (post_score - pre_score) / pre_score if pre_score > 0 else 0
-                })
-        
-        interventions_df = pd.DataFrame(interventions_data)
+        n_interventions = 1000
+        child_idx = rng.integers(0, n_children, n_interventions)
+        interventions = pd.DataFrame({
+            'child_id': children_df['child_id'].values[child_idx],
+            'intervention_date': pd.Timestamp.now() - pd.to_timedelta(rng.integers(30, 300, n_interventions), unit='D'),
+            'intervention_type': rng.choice(['reading_support', 'math_tutoring', 'attention_training', 'social_skills'], n_interventions),
+            'intervention_duration': rng.integers(2, 12, n_interventions),  # weeks
+            # Intervention effectiveness (varies by type and child); more effective for children with learning differences
+            'effectiveness': rng.uniform(0.1, 0.4, n_interventions) *
+                             np.where(children_df['learning_differences'].values[child_idx] != 'None', 1.2, 1.0)
+        }).sort_values('intervention_date', kind='mergesort')
+        
+        # Running mean of each child's scores, so the last session before an intervention carries its pre-score
+        history = sessions_df[['child_id', 'session_date', 'performance_score']].sort_values('session_date', kind='mergesort')
+        scores = history.groupby('child_id')['performance_score']
+        history['pre_score'] = scores.cumsum() / (scores.cumcount() + 1)
+        
+        # Attach each intervention to the child's latest earlier session; children with none are skipped
+        interventions = pd.merge_asof(
+            interventions, history[['child_id', 'session_date', 'pre_score']],
+            left_on='intervention_date', right_on='session_date', by='child_id',
+            allow_exact_matches=False
+        ).dropna(subset=['pre_score'])
+        
+        pre_score = interventions['pre_score'].values
+        post_score = np.minimum(100, pre_score + interventions['effectiveness'].values * (100 - pre_score))
+        
+        interventions_df = pd.DataFrame({
+            'child_id': interventions['child_id'].values,
+            'intervention_date': interventions['intervention_date'].dt.normalize().values,
+            'intervention_type': interventions['intervention_type'].values,
+            'pre_intervention_score': pre_score,
+            'post_intervention_score': post_score,
+            'intervention_duration': interventions['intervention_duration'].values,
+            'effectiveness_score': np.divide(post_score - pre_score, pre_score,
+                                             out=np.zeros_like(pre_score), where=pre_score > 0)
+        })
         
         return {
             'children': children_df,
@@ -261,6 +588,10 @@ class AdvancedPredictiveLearningAnalytics:
     
     def _train_trajectory_models(self, training_data: Dict[str, pd.DataFrame]):
         """Train learning trajectory prediction models"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.metrics import mean_squared_error
+        from sklearn.model_selection import train_test_split
+        
         sessions_df = training_data['sessions']
         children_df = training_data['children']
         
@@ -273,100 +604,135 @@ class AdvancedPredictiveLearningAnalytics:
             if len(subject_data) < 100:
                 continue
             
+            # Hold out each child's latest session; features come from the sessions before it
+            subject_data = subject_data.sort_values('session_date', kind='mergesort')
+            is_latest = subject_data.groupby('child_id', sort=False).cumcount(ascending=False) == 0
+            next_scores = subject_data.loc[is_latest].set_index('child_id')['performance_score']
+            
             # Feature engineering
-            features = self._engineer_trajectory_features(subject_data)
+            engineered = self._engineer_trajectory_features(subject_data.loc[~is_latest])
             
-            if features is None or len(features) == 0:
+            if engineered is None:
                 continue
+            features, child_ids = engineered
             
-            # Prepare target variable (future performance)
-            target = subject_data['performance_score'].values
+            # Prepare target variable (future performance), one per feature row
+            target = next_scores.loc[child_ids].values.astype(np.float32)
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
                 features, target, test_size=0.2, random_state=42
             )
             
-            # Scale features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-            
-            # Train ensemble model
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-            model.fit(X_train_scaled, y_train)
+            # Train ensemble model on raw features (tree splits are unaffected by scaling);
+            # shallow, bounded trees keep single-row predictions fast
+            model = RandomForestRegressor(n_estimators=50, max_depth=8, max_leaf_nodes=64, n_jobs=1, random_state=42)
+            model = fit_estimator(model, X_train, y_train)
             
             # Evaluate model
-            y_pred = model.predict(X_test_scaled)
+            y_pred = model.predict(X_test)
             mse = mean_squared_error(y_test, y_pred)
             
             print(f"Trajectory model for {subject} - MSE: {mse:.2f}")
             
-            # Store model and scaler
+            # Store model
             self.trajectory_models[subject] = model
-            self.scalers[f'trajectory_{subject}'] = scaler
             
             # Save model
             os.makedirs('models', exist_ok=True)
-            joblib.dump(model, f'models/{subject}_trajectory_model.pkl')
-            joblib.dump(scaler, f'models/{subject}_trajectory_scaler.pkl')
+            self._save_model_bundle(f'models/{subject}_trajectory.pkl', model)
+            self._export_onnx_model(model, subject, features.shape[1])
+    
+    def _save_model_bundle(self, path: str, model, scaler=None):
+        """Save a model and its scaler together in one compressed file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump({'model': model, 'scaler': scaler}, path, compress=MODEL_COMPRESSION)
+    
+    def _export_onnx_model(self, model, subject: str, n_features: int):
+        """Convert a trained trajectory model to ONNX and serve it through ONNX Runtime"""
+        if ort is None:
+            return
+        
+        try:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+            
+            onnx_model = convert_sklearn(model, initial_types=[('input', FloatTensorType([None, n_features]))])
+            onnx_path = f'models/{subject}_trajectory_model.onnx'
+            with open(onnx_path, 'wb') as f:
+                f.write(onnx_model.SerializeToString())
+            self.onnx_sessions[subject] = self._load_onnx_session(onnx_path)
+            
+        except Exception as e:
+            print(f"ONNX export for {subject} failed: {e}")
+    
+    def _load_onnx_session(self, onnx_path: str):
+        """Single-threaded CPU inference session; requests are one row, so threading only adds overhead"""
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        return ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
     
-    def _engineer_trajectory_features(self, data: pd.DataFrame) -> Optional[np.ndarray]:
-        """Engineer features for trajectory prediction"""
+    def _engineer_trajectory_features(self, data: pd.DataFrame) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Engineer features for trajectory prediction, returned with the child id of each row"""
         try:
             if len(data) == 0:
                 return None
             
-            # Group by child and calculate features
-            child_features = []
+            # Order each child's sessions by date; t is the session's position within its child
+            data = data.sort_values('session_date', kind='mergesort')
+            t = data.groupby('child_id', sort=False).cumcount().astype(float)
+            data = data.assign(t=t, tt=t * t, ty=t * data['performance_score'])
+            
+            # All per-child statistics in one grouped pass
+            stats = data.groupby('child_id', sort=False).agg(
+                n=('performance_score', 'size'),
+                score_mean=('performance_score', 'mean'),
+                score_std=('performance_score', 'std'),
+                score_last=('performance_score', 'last'),
+                sum_y=('performance_score', 'sum'),
+                sum_t=('t', 'sum'),
+                sum_tt=('tt', 'sum'),
+                sum_ty=('ty', 'sum'),
+                engagement=('engagement_score', 'mean'),
+                time_spent=('time_spent', 'mean'),
+                difficulty=('difficulty_level', 'mean'),
+                mistakes=('mistakes_count', 'mean'),
+                hints=('hints_used', 'mean'),
+                age=('age', 'first'),
+                baseline_ability=('baseline_ability', 'first'),
+                learning_differences=('learning_differences', 'first')
+            )
             
-            for child_id in data['child_id'].unique():
-                child_data = data[data['child_id'] == child_id].copy()
-                child_data = child_data.sort_values('session_date')
-                
-                if len(child_data) < 3:  # Need at least 3 sessions
-                    continue
-                
-                # Calculate features
-                features = []
-                
-                # Performance features
-                features.append(child_data['performance_score'].mean())
-                features.append(child_data['performance_score'].std())
-                features.append(child_data['performance_score'].iloc[-1])  # Latest score
-                
-                # Trend features
-                scores = child_data['performance_score'].values
-                if len(scores) > 1:
-                    trend = np.polyfit(range(len(scores)), scores, 1)[0]  # Linear trend
-                    features.append(trend)
-                else:
-                    features.append(0)
-                
-                # Engagement features
-                features.append(child_data['engagement_score'].mean())
-                features.append(child_data['time_spent'].mean())
-                
-                # Difficulty adaptation
-                features.append(child_data['difficulty_level'].mean())
-                
-                # Error patterns
-                features.append(child_data['mistakes_count'].mean())
-                features.append(child_data['hints_used'].mean())
-                
-                # Child characteristics
-                child_info = child_data.iloc[0]
-                features.append(child_info['age'])
-                features.append(child_info['baseline_ability'])
-                
-                # Learning differences (one-hot encoded)
-                learning_diff = child_info['learning_differences']
-                for diff in ['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia']:
-                    features.append(1 if learning_diff == diff else 0)
-                
-                child_features.append(features)
+            stats = stats[stats['n'] >= 3]  # Need at least 3 sessions
+            if len(stats) == 0:
+                return None
+            
+            # Least-squares slope of score against session position
+            trend = grouped_slope(
+                stats['n'].values, stats['sum_t'].values, stats['sum_y'].values,
+                stats['sum_tt'].values, stats['sum_ty'].values
+            )
             
-            return np.array(child_features) if child_features else None
+            # Columns are written straight into one float32 matrix
+            features = np.empty((len(stats), TRAJECTORY_FEATURE_COUNT), dtype=np.float32)
+            features[:, 0] = stats['score_mean'].values
+            features[:, 1] = stats['score_std'].values
+            features[:, 2] = stats['score_last'].values
+            features[:, 3] = trend
+            features[:, 4] = stats['engagement'].values
+            features[:, 5] = stats['time_spent'].values
+            features[:, 6] = stats['difficulty'].values
+            features[:, 7] = stats['mistakes'].values
+            features[:, 8] = stats['hints'].values
+            features[:, 9] = stats['age'].values
+            features[:, 10] = stats['baseline_ability'].values
+            
+            # Learning differences (one-hot encoded)
+            for col, diff in enumerate(['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia'], start=11):
+                features[:, col] = stats['learning_differences'].values == diff
+            
+            return features, stats.index.values
             
         except Exception as e:
             print(f"Feature engineering failed: {e}")
@@ -374,6 +740,10 @@ class AdvancedPredictiveLearningAnalytics:
     
     def _train_intervention_models(self, training_data: Dict[str, pd.DataFrame]):
         """Train intervention timing and effectiveness models"""
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        
         interventions_df = training_data['interventions']
         sessions_df = training_data['sessions']
         children_df = training_data['children']
@@ -384,139 +754,124 @@ class AdvancedPredictiveLearningAnalytics:
         # Merge data
         merged_df = interventions_df.merge(children_df, on='child_id')
         
+        # Pair every intervention with the child's sessions in the 30 days before it
+        windows = merged_df[['child_id', 'intervention_date']].assign(
+            intervention_id=merged_df.index
+        ).merge(sessions_df, on='child_id')
+        windows = windows[
+            (windows['session_date'] < windows['intervention_date']) &
+            (windows['session_date'] >= windows['intervention_date'] - timedelta(days=30))
+        ].sort_values(['intervention_id', 'session_date'], kind='mergesort')
+        
         # Feature engineering for intervention timing
-        features = []
-        targets = []
+        t = windows.groupby('intervention_id').cumcount().astype(float)
+        y = windows['performance_score']
+        windows = windows.assign(t=t, tt=t * t, ty=t * y, yy=y * y)
+        stats = windows.groupby('intervention_id').agg(
+            n=('performance_score', 'size'),
+            score_mean=('performance_score', 'mean'),
+            score_last=('performance_score', 'last'),
+            sum_y=('performance_score', 'sum'),
+            sum_yy=('yy', 'sum'),
+            sum_t=('t', 'sum'),
+            sum_tt=('tt', 'sum'),
+            sum_ty=('ty', 'sum'),
+            engagement=('engagement_score', 'mean'),
+            time_spent=('time_spent', 'mean'),
+            mistakes=('mistakes_count', 'mean')
+        )
+        stats = stats[stats['n'] >= 3]
         
-        for _, intervention in merged_df.iterrows():
-            child_id = intervention['child_id']
-            intervention_date = pd.to_datetime(intervention['intervention_date'])
-            
-            # Get child's recent performance before intervention
-            recent_sessions = sessions_df[
-                (sessions_df['child_id'] == child_id) & 
-                (pd.to_datetime(sessions_df['session_date']) < intervention_date) &
-                (pd.to_datetime(sessions_df['session_date']) >= intervention_date - timedelta(days=30))
-            ]
-            
-            if len(recent_sessions) < 3:
-                continue
-            
-            # Calculate features
-            feature_vector = []
-            
+        if len(stats) < 10:
+            return
+        
+        n = stats['n'].values
+        score_mean = stats['score_mean'].values
+        info = merged_df.loc[stats.index]
+        
+        columns = [
             # Performance trend
-            scores = recent_sessions['performance_score'].values
-            trend = np.polyfit(range(len(scores)), scores, 1)[0]
-            feature_vector.extend([
-                scores.mean(),
-                scores.std(),
-                trend,
-                scores[-1]  # Most recent score
-            ])
-            
+            score_mean,
+            np.sqrt(np.maximum(stats['sum_yy'].values / n - score_mean ** 2, 0)),  # population std, as np.std
+            grouped_slope(n, stats['sum_t'].values, stats['sum_y'].values, stats['sum_tt'].values, stats['sum_ty'].values),
+            stats['score_last'].values,  # Most recent score
             # Engagement and effort
-            feature_vector.extend([
-                recent_sessions['engagement_score'].mean(),
-                recent_sessions['time_spent'].mean(),
-                recent_sessions['mistakes_count'].mean()
-            ])
-            
+            stats['engagement'].values,
+            stats['time_spent'].values,
+            stats['mistakes'].values,
             # Child characteristics
-            feature_vector.extend([
-                intervention['age'],
-                intervention['baseline_ability']
-            ])
-            
-            # Learning differences
-            learning_diff = intervention['learning_differences']
-            for diff in ['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia']:
-                feature_vector.append(1 if learning_diff == diff else 0)
-            
-            features.append(feature_vector)
-            
-            # Target: intervention effectiveness
-            effectiveness = intervention['effectiveness_score']
-            targets.append(1 if effectiveness > 0.1 else 0)  # Binary: effective or not
+            info['age'].values,
+            info['baseline_ability'].values
+        ]
         
-        if len(features) < 10:
-            return
+        # Learning differences
+        for diff in ['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia']:
+            columns.append((info['learning_differences'].values == diff).astype(float))
         
-        features = np.array(features)
-        targets = np.array(targets)
+        features = np.column_stack(columns).astype(np.float32)
+        
+        # Target: intervention effectiveness, binary: effective or not
+        targets = (info['effectiveness_score'].values > 0.1).astype(int)
         
         # Train intervention timing model
         X_train, X_test, y_train, y_test = train_test_split(
             features, targets, test_size=0.2, random_state=42
         )
         
-        # Scale features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        # Train model
-        model = GradientBoostingClassifier(n_estimators=100, random_state=42)
-        model.fit(X_train_scaled, y_train)
+        # Train model on raw features; boosted trees need no scaling
+        model = GradientBoostingClassifier(n_estimators=100, max_depth=3, random_state=42)
+        model = fit_estimator(model, X_train, y_train)
         
         # Evaluate
-        y_pred = model.predict(X_test_scaled)
+        y_pred = model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f"Intervention model accuracy: {accuracy:.2f}")
         
         # Store model
         self.intervention_models['timing'] = model
-        self.scalers['intervention_timing'] = scaler
         
         # Save model
-        joblib.dump(model, 'models/intervention_timing_model.pkl')
-        joblib.dump(scaler, 'models/intervention_timing_scaler.pkl')
+        self._save_model_bundle('models/intervention_timing.pkl', model)
     
     def _train_population_models(self, training_data: Dict[str, pd.DataFrame]):
         """Train population-level analytics models"""
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        
         # This would typically involve more complex population-level features
         # For now, create a simple success prediction model
         
         sessions_df = training_data['sessions']
         children_df = training_data['children']
         
-        # Aggregate data by child
-        child_success = []
-        
-        for child_id in children_df['child_id'].unique():
-            child_sessions = sessions_df[sessions_df['child_id'] == child_id]
-            child_info = children_df[children_df['child_id'] == child_id].iloc[0]
-            
-            if len(child_sessions) < 5:
-                continue
-            
-            # Define success as improvement over time
-            scores = child_sessions.sort_values('session_date')['performance_score'].values
-            if len(scores) > 1:
-                improvement = scores[-1] - scores[0]
-                success = 1 if improvement > 5 else 0  # 5 point improvement = success
-            else:
-                continue
-            
-            # Features
-            features = [
-                child_info['age'],
-                child_info['baseline_ability'],
-                1 if child_info['learning_differences'] != 'None' else 0,
-                child_sessions['engagement_score'].mean(),
-                child_sessions['time_spent'].mean(),
-                len(child_sessions)  # Number of sessions
-            ]
-            
-            child_success.append((features, success))
+        # Aggregate data by child in one grouped pass over date-ordered sessions
+        stats = sessions_df.sort_values('session_date', kind='mergesort').groupby('child_id').agg(
+            n_sessions=('performance_score', 'size'),
+            first_score=('performance_score', 'first'),
+            last_score=('performance_score', 'last'),
+            engagement=('engagement_score', 'mean'),
+            time_spent=('time_spent', 'mean')
+        )
+        stats = stats[stats['n_sessions'] >= 5]
+        child_success = children_df.merge(stats, left_on='child_id', right_index=True)
         
         if len(child_success) < 50:
             return
         
-        features, targets = zip(*child_success)
-        features = np.array(features)
-        targets = np.array(targets)
+        # Features
+        features = np.column_stack([
+            child_success['age'].values,
+            child_success['baseline_ability'].values,
+            (child_success['learning_differences'].values != 'None').astype(float),
+            child_success['engagement'].values,
+            child_success['time_spent'].values,
+            child_success['n_sessions'].values  # Number of sessions
+        ]).astype(np.float32)
+        
+        # Define success as improvement over time: 5 point improvement = success
+        targets = ((child_success['last_score'].values - child_success['first_score'].values) > 5).astype(int)
         
         # Train model
         X_train, X_test, y_train, y_test = train_test_split(
@@ -524,7 +879,7 @@ class AdvancedPredictiveLearningAnalytics:
         )
         
         model = LogisticRegression(random_state=42)
-        model.fit(X_train, y_train)
+        model = fit_estimator(model, X_train, y_train)
         
         # Evaluate
         y_pred = model.predict(X_test)
@@ -536,57 +891,63 @@ class AdvancedPredictiveLearningAnalytics:
         self.population_models['success_predictor'] = model
         
         # Save model
-        joblib.dump(model, 'models/population_success_model.pkl')
+        self._save_model_bundle('models/population_success.pkl', model)
     
     def _create_fallback_models(self):
         """Create simple fallback models if training fails"""
-        # Simple linear regression fallback
-        self.trajectory_models['reading'] = LinearRegression()
-        self.trajectory_models['math'] = LinearRegression()
-        self.intervention_models['timing'] = LogisticRegression()
-        self.population_models['success_predictor'] = LogisticRegression()
-        
-        # Fit with dummy data
-        dummy_X = np.random.random((100, 10))
-        dummy_y_reg = np.random.random(100) * 100
-        dummy_y_class = np.random.randint(0, 2, 100)
-        
-        for model in self.trajectory_models.values():
-            model.fit(dummy_X, dummy_y_reg)
-        
-        self.intervention_models['timing'].fit(dummy_X, dummy_y_class)
-        self.population_models['success_predictor'].fit(dummy_X[:, :6], dummy_y_class)
+        # Constant predictors; fitting real models on random data gives equally meaningless output
+        self.trajectory_models['reading'] = ConstantRegressor(70.0)
+        self.trajectory_models['math'] = ConstantRegressor(70.0)
+        self.intervention_models['timing'] = ConstantClassifier(0.5)
+        self.population_models['success_predictor'] = ConstantClassifier(0.5)
+        self.fallback_models = True
         
         print("Created fallback models")
     
     def predict_learning_trajectory(self, child_profile: Dict, historical_data: List[Dict]) -> Dict:
         """Predict learning trajectory for the next 3-6 months"""
-        try:
-            if not historical_data or len(historical_data) < 3:
-                return self._generate_mock_trajectory_prediction(child_profile)
-            
-            # Extract features from historical data
-            features = self._extract_trajectory_features(child_profile, historical_data)
-            
-            if features is None:
-                return self._generate_mock_trajectory_prediction(child_profile)
+        return self.predict_learning_trajectory_batch([child_profile], [historical_data])[0]
+    
+    def predict_learning_trajectory_batch(self, child_profiles: List[Dict], histories: List[List[Dict]]) -> List[Dict]:
+        """Predict learning trajectories for several children with one model call per skill"""
+        results = [None] * len(child_profiles)
+        
+        # Extract features from historical data; children without enough history get the demo prediction,
+        # as does everyone when only the constant fallback models are available
+        rows = []
+        features = []
+        for i, (child_profile, historical_data) in enumerate(zip(child_profiles, histories)):
+            child_features = None
+            if not self.fallback_models and historical_data and len(historical_data) >= 3:
+                child_features = self._extract_trajectory_features(child_profile, historical_data)
             
-            # Make predictions for different skill areas
-            trajectories = []
+            if child_features is None:
+                results[i] = self._generate_mock_trajectory_prediction(child_profile)
+            else:
+                rows.append(i)
+                features.append(child_features)
+        
+        if not rows:
+            return results
+        
+        try:
+            # Make predictions for different skill areas, all children at once
+            X = np.array(features, dtype=np.float32)
+            predictions = {
+                skill: self._predict_trajectory_levels(skill, X)
+                for skill in ['reading', 'math', 'attention', 'social_skills']
+                if skill in self.trajectory_models
+            }
             
-            for skill in ['reading', 'math', 'attention', 'social_skills']:
-                if skill in self.trajectory_models:
-                    model = self.trajectory_models[skill]
-                    scaler = self.scalers.get(f'trajectory_{skill}')
-                    
-                    if scaler:
-                        features_scaled = scaler.transform([features])
-                        predicted_level = model.predict(features_scaled)[0]
-                    else:
-                        predicted_level = model.predict([features])[0]
+            for row, i in enumerate(rows):
+                child_profile, historical_data = child_profiles[i], histories[i]
+                trajectories = []
+                
+                for skill, levels in predictions.items():
+                    predicted_level = levels[row]
                     
                     # Calculate confidence based on model performance
-                    confidence = min(max(0.6 + np.random.normal(0, 0.1), 0.4), 0.95)
+                    confidence = min(max(0.6 + random.gauss(0, 0.1), 0.4), 0.95)
                     
                     # Determine trajectory direction
                     current_performance = historical_data[-1].get(f'{skill}_score', 70)
@@ -600,18 +961,31 @@ class AdvancedPredictiveLearningAnalytics:
                         'trajectory': trajectory_direction,
                         'key_factors': self._identify_key_factors(child_profile, historical_data, skill)
                     })
-            
-            return {
-                'success': True,
-                'trajectory': trajectories,
-                'prediction_horizon': '3-6 months',
-                'model_version': 'v2.0',
-                'last_updated': datetime.now().isoformat()
-            }
+                
+                results[i] = {
+                    'success': True,
+                    'trajectory': trajectories,
+                    'prediction_horizon': '3-6 months',
+                    'model_version': 'v2.0',
+                    'last_updated': clock.iso()
+                }
             
         except Exception as e:
             print(f"Trajectory prediction failed: {e}")
-            return self._generate_mock_trajectory_prediction(child_profile)
+            for i in rows:
+                results[i] = self._generate_mock_trajectory_prediction(child_profiles[i])
+        
+        return results
+    
+    def _predict_trajectory_levels(self, skill: str, X: np.ndarray) -> np.ndarray:
+        """Predicted levels for a skill, one per feature row"""
+        scaler = self.scalers.get(f'trajectory_{skill}')
+        X_scaled = scaler.transform(X) if scaler is not None else X
+        
+        session = self.onnx_sessions.get(skill)
+        if session is not None:
+            return session.run(None, {'input': X_scaled.astype(np.float32, copy=False)})[0].ravel().astype(float)
+        return self.trajectory_models[skill].predict(X_scaled)
     
     def _extract_trajectory_features(self, child_profile: Dict, historical_data: List[Dict]) -> Optional[List[float]]:
         """Extract features for trajectory prediction"""
@@ -631,7 +1005,7 @@ class AdvancedPredictiveLearningAnalytics:
             
             # Trend features
             if len(recent_scores) > 1:
-                trend = np.polyfit(range(len(recent_scores)), recent_scores, 1)[0]
+                trend = linear_slope(recent_scores)
                 features.append(trend)
             else:
                 features.append(0)
@@ -652,7 +1026,7 @@ class AdvancedPredictiveLearningAnalytics:
             ])
             
             # Learning differences
-            learning_diffs = child_profile.get('learning_differences', [])
+            learning_diffs = child_profile.get('learning_differences') or ()
             for diff in ['ADHD', 'Dyslexia', 'Autism', 'Dyscalculia']:
                 features.append(1 if diff in learning_diffs else 0)
             
@@ -668,7 +1042,7 @@ class AdvancedPredictiveLearningAnalytics:
         
         try:
             # Analyze learning differences impact
-            learning_diffs = child_profile.get('learning_differences', [])
+            learning_diffs = child_profile.get('learning_differences') or ()
             if 'ADHD' in learning_diffs:
                 factors.append('Attention regulation strategies')
             if 'Dyslexia' in learning_diffs:
@@ -700,281 +1074,190 @@ class AdvancedPredictiveLearningAnalytics:
     
     def _generate_mock_trajectory_prediction(self, child_profile: Dict) -> Dict:
         """Generate mock trajectory prediction for demonstration"""
-        trajectories = []
-        
-        skills = ['Reading Fluency', 'Math Computation', 'Attention Span', 'Social Skills']
-        current_levels = [72, 65, 78, 68]
-        
-        for skill, current in zip(skills, current_levels):
-            predicted = min(100, current + np.random.randint(5, 15))
-            confidence = np.random.uniform(0.75, 0.92)
-            
-            trajectories.append({
-                'skill': skill,
-                'current_level': current,
-                'predicted_level': predicted,
-                'confidence': confidence,
-                'trajectory': 'improving',
-                'key_factors': [
-                    'Consistent practice schedule',
-                    'Adaptive difficulty levels',
-                    'Positive reinforcement',
-                    'Multi-sensory learning approaches'
-                ]
-            })
+        trajectories = [{
+            'skill': skill,
+            'current_level': current,
+            'predicted_level': min(100, current + random.randrange(5, 15)),
+            'confidence': random.uniform(0.75, 0.92),
+            'trajectory': 'improving',
+            'key_factors': MOCK_KEY_FACTORS
+        } for skill, current in MOCK_CURRENT_LEVELS]
         
         return {
             'success': True,
             'trajectory': trajectories,
             'prediction_horizon': '3-6 months',
             'model_version': 'v2.0_demo',
-            'last_updated': datetime.now().isoformat()
+            'last_updated': clock.iso()
         }
     
     def assess_intervention_timing(self, child_profile: Dict, current_performance: Dict) -> Dict:
         """Assess optimal timing for interventions"""
+        skills = list(current_performance)
         try:
-            interventions = []
-            
-            for skill, performance in current_performance.items():
-                # Determine if intervention is needed
-                intervention_needed = False
-                timing = "continue_monitoring"
-                intervention_type = "none"
-                
-                if performance < 60:
-                    intervention_needed = True
-                    timing = "immediate"
-                    intervention_type = "intensive_support"
-                elif performance < 75:
-                    intervention_needed = True
-                    timing = "within_2_weeks"
-                    intervention_type = "targeted_practice"
-                elif performance < 85:
-                    timing = "within_month"
-                    intervention_type = "skill_reinforcement"
-                
-                # Calculate expected improvement
-                if intervention_needed:
-                    base_improvement = np.random.uniform(0.15, 0.35)
-                    # Adjust based on child characteristics
-                    if 'ADHD' in child_profile.get('learning_differences', []):
-                        base_improvement *= 0.8  # May take longer
-                    if 'Autism' in child_profile.get('learning_differences', []):
-                        base_improvement *= 1.2  # Often responds well to structured intervention
-                    
-                    expected_improvement = f"+{int(base_improvement * (100 - performance))} points in 6-8 weeks"
-                else:
-                    expected_improvement = "Monitor progress"
-                
-                # Confidence based on historical success rates
-                confidence = np.random.uniform(0.78, 0.94)
-                
-                interventions.append({
-                    'skill': skill.replace('_', ' ').title(),
-                    'current_performance': performance,
-                    'intervention_needed': intervention_needed,
-                    'optimal_timing': timing,
-                    'intervention_type': intervention_type,
-                    'expected_improvement': expected_improvement,
-                    'confidence': confidence
-                })
-            
-            return {
-                'success': True,
-                'interventions': interventions,
-                'assessment_date': datetime.now().isoformat(),
-                'next_assessment': (datetime.now() + timedelta(weeks=2)).isoformat()
-            }
-            
-        except Exception as e:
+            performances = np.fromiter(current_performance.values(), dtype=np.float64, count=len(skills))
+        except (TypeError, ValueError) as e:
             print(f"Intervention timing assessment failed: {e}")
             return {'success': False, 'error': str(e)}
+        
+        # Adjust expected improvement for child characteristics
+        learning_diffs = frozenset(child_profile.get('learning_differences') or ())
+        adhd_factor = 0.8 if 'ADHD' in learning_diffs else 1.0  # May take longer
+        autism_factor = 1.2 if 'Autism' in learning_diffs else 1.0  # Often responds well to structured intervention
+        adjustment = adhd_factor * autism_factor
+        
+        # Urgency bucket and expected improvement per skill
+        buckets, expected_points = intervention_scores(performances, adjustment, rng.random(performances.size))
+        buckets = buckets.tolist()
+        expected_points = expected_points.tolist()
+        
+        # Confidence based on historical success rates
+        confidences = rng.uniform(0.78, 0.94, performances.size)
+        
+        interventions = [InterventionAssessment(
+            skill.replace('_', ' ').title(),
+            current_performance[skill],
+            bucket >= INTERVENTION_NEEDED_BUCKET,
+            INTERVENTION_TIMINGS[bucket],
+            INTERVENTION_TYPES[bucket],
+            IMPROVEMENT_TEMPLATE % points if bucket >= INTERVENTION_NEEDED_BUCKET else "Monitor progress",
+            confidence
+        ) for skill, bucket, points, confidence in zip(skills, buckets, expected_points, confidences.tolist())]
+        
+        return {
+            'success': True,
+            'interventions': interventions,
+            'assessment_date': clock.iso(),
+            'next_assessment': (clock.now() + NEXT_ASSESSMENT_INTERVAL).isoformat()
+        }
     
     def generate_population_insights(self, school_data: List[Dict]) -> Dict:
         """Generate population-level insights for schools/districts"""
+        # Calculate population metrics
+        total_students = 0
+        students_with_differences = 0
         try:
-            # Calculate population metrics
-            total_students = sum(school['total_students'] for school in school_data)
-            students_with_differences = sum(school['with_learning_differences'] for school in school_data)
-            
-            # Generate insights
-            insights = {
-                'total_students_analyzed': total_students,
-                'students_with_learning_differences': students_with_differences,
-                'prevalence_rate': f"{(students_with_differences / total_students * 100):.1f}%",
-                
-                'overall_success_rate': np.random.randint(82, 89),
-                'average_improvement': np.random.randint(18, 25),
-                'total_students_helped': students_with_differences,
-                
-                'most_effective_interventions': [
-                    {'name': 'Reading Fluency Support', 'success_rate': 87},
-                    {'name': 'Math Problem-Solving Strategies', 'success_rate': 84},
-                    {'name': 'Attention Training Programs', 'success_rate': 81},
-                    {'name': 'Social Skills Development', 'success_rate': 79}
-                ],
-                
-                'key_findings': [
-                    'Early intervention (ages 6-8) shows 23% higher success rates',
-                    'Multi-modal learning approaches increase engagement by 34%',
-                    'Parent involvement correlates with 28% better outcomes',
-                    'Peer support programs reduce behavioral challenges by 41%'
-                ],
-                
-                'recommendations': [
-                    'Implement universal screening for learning differences',
-                    'Increase professional development for teachers',
-                    'Expand parent education and support programs',
-                    'Develop peer mentorship programs'
-                ],
-                
-                'trends': {
-                    'identification_rate_change': '+12% over past year',
-                    'intervention_effectiveness_trend': 'improving',
-                    'resource_utilization': '78% optimal',
-                    'family_satisfaction': '91% positive'
-                }
-            }
-            
-            return {
-                'success': True,
-                'insights': insights,
-                'analysis_date': datetime.now().isoformat(),
-                'sample_size': total_students,
-                'confidence_level': 0.87
-            }
-            
-        except Exception as e:
+            for school in school_data:
+                total_students += school['total_students']
+                students_with_differences += school['with_learning_differences']
+            prevalence_rate = PREVALENCE_TEMPLATE % (students_with_differences / total_students * 100)
+        except (KeyError, TypeError, ZeroDivisionError) as e:
             print(f"Population insights generation failed: {e}")
             return {'success': False, 'error': str(e)}
+        
+        success_rate, average_improvement = rng.integers(POPULATION_METRIC_LOW, POPULATION_METRIC_HIGH).tolist()
+        
+        # Generate insights
+        insights = {
+            'total_students_analyzed': total_students,
+            'students_with_learning_differences': students_with_differences,
+            'prevalence_rate': prevalence_rate,
+            
+            'overall_success_rate': success_rate,
+            'average_improvement': average_improvement,
+            'total_students_helped': students_with_differences,
+            
+            'most_effective_interventions': MOST_EFFECTIVE_INTERVENTIONS,
+            
+            'key_findings': POPULATION_KEY_FINDINGS,
+            
+            'recommendations': POPULATION_RECOMMENDATIONS,
+            
+            'trends': POPULATION_TRENDS
+        }
+        
+        return {
+            'success': True,
+            'insights': insights,
+            'analysis_date': clock.iso(),
+            'sample_size': total_students,
+            'confidence_level': 0.87
+        }
     
     def get_comprehensive_analytics_dashboard(self, child_id: str) -> Dict:
         """Get comprehensive analytics dashboard data"""
-        try:
-            # This would typically query the database for real data
-            # For demo purposes, generate realistic analytics
-            
-            dashboard_data = {
-                'performance_trends': {
-                    'reading': {
-                        'current': np.random.randint(70, 85),
-                        'trend': f"+{np.random.randint(8, 15)}%",
-                        'prediction': f"{np.random.randint(78, 88)}% by next month"
-                    },
-                    'math': {
-                        'current': np.random.randint(65, 80),
-                        'trend': f"+{np.random.randint(5, 12)}%",
-                        'prediction': f"{np.random.randint(72, 85)}% by next month"
-                    },
-                    'focus': {
-                        'current': np.random.randint(75, 90),
-                        'trend': f"+{np.random.randint(3, 8)}%",
-                        'prediction': f"{np.random.randint(80, 92)}% by next month"
-                    },
-                    'social': {
-                        'current': np.random.randint(68, 82),
-                        'trend': f"+{np.random.randint(10, 18)}%",
-                        'prediction': f"{np.random.randint(75, 88)}% by next month"
-                    }
-                },
-                
-                'learning_patterns': {
-                    'best_learning_time': 'Morning (9-11 AM)',
-                    'optimal_session_length': '15-20 minutes',
-                    'engagement_drivers': [
-                        'Visual content and graphics',
-                        'Interactive games and activities',
-                        'Immediate positive feedback',
-                        'Choice in learning activities'
-                    ],
-                    'challenge_areas': [
-                        'Complex multi-step instructions',
-                        'Extended focus requirements',
-                        'Transition between activities'
-                    ]
-                },
-                
-                'intervention_recommendations': [
-                    {
-                        'area': 'Reading Fluency',
-                        'recommendation': 'Increase daily reading practice to 20 minutes with age-appropriate books',
-                        'expected_impact': '+15% improvement in 6 weeks',
-                        'priority': 'high'
-                    },
-                    {
-                        'area': 'Attention Span',
-                        'recommendation': 'Implement movement breaks every 15 minutes during learning sessions',
-                        'expected_impact': '+20% sustained attention',
-                        'priority': 'medium'
-                    },
-                    {
-                        'area': 'Math Problem Solving',
-                        'recommendation': 'Use visual manipulatives and step-by-step problem breakdown',
-                        'expected_impact': '+12% accuracy improvement',
-                        'priority': 'medium'
-                    }
-                ],
-                
-                'milestone_predictions': [
-                    {
-                        'skill': 'Reading grade level',
-                        'current': '2.1',
-                        'predicted': '2.5 by December'
-                    },
-                    {
-                        'skill': 'Math facts fluency',
-                        'current': '65%',
-                        'predicted': '80% by November'
-                    },
-                    {
-                        'skill': 'Independent task completion',
-                        'current': '70%',
-                        'predicted': '85% by January'
-                    }
-                ]
-            }
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        
+        # This would typically query the database for real data
+        # For demo purposes, generate realistic analytics
+        trend_draws = rng.integers(DASHBOARD_TREND_LOW, DASHBOARD_TREND_HIGH).tolist()
+        
+        dashboard_data = {
+            'performance_trends': {
+                area: {
+                    'current': current,
+                    'trend': f"+{trend}%",
+                    'prediction': f"{prediction}% by next month"
+                }
+                for area, (current, trend, prediction) in zip(DASHBOARD_TREND_AREAS, trend_draws)
+            },
             
-            return {
-                'success': True,
-                'analytics': dashboard_data,
-                'generated_date': datetime.now().isoformat(),
-                'child_id': child_id
-            }
+            'learning_patterns': LEARNING_PATTERNS,
             
-        except Exception as e:
-            print(f"Analytics dashboard generation failed: {e}")
-            return {'success': False, 'error': str(e)}
+            'intervention_recommendations': INTERVENTION_RECOMMENDATIONS,
+            
+            'milestone_predictions': MILESTONE_PREDICTIONS
+        }
+        
+        dashboard = {
+            'success': True,
+            'analytics': dashboard_data,
+            'generated_date': clock.iso(),
+            'child_id': child_id
+        }
+        
+        # Cached dashboards are shared between callers and must not be mutated
+        with self._dash_cache_lock:
+            self._dash_cache[child_id] = (time.monotonic() + DASHBOARD_CACHE_TTL, dashboard, None)
+            self._dash_cache.move_to_end(child_id)
+            while len(self._dash_cache) > DASHBOARD_CACHE_SIZE:
+                self._dash_cache.popitem(last=False)
+        
+        return dashboard
+    
+    def get_comprehensive_analytics_dashboard_json(self, child_id: str) -> bytes:
+        """Analytics dashboard as JSON bytes, serialized once per cached dashboard"""
+        dashboard = self.get_comprehensive_analytics_dashboard(child_id)
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[1] is dashboard and entry[2] is not None:
+                return entry[2]
+        
+        payload = dumps_json_bytes(dashboard)
+        with self._dash_cache_lock:
+            entry = self._dash_cache.get(child_id)
+            if entry is not None and entry[1] is dashboard:
+                self._dash_cache[child_id] = (entry[0], dashboard, payload)
+        return payload
+    
+    def generate_population_insights_json(self, school_data: List[Dict]) -> bytes:
+        """Population insights as JSON bytes, ready to send as a response body"""
+        return dumps_json_bytes(self.generate_population_insights(school_data))
     
     def store_learning_session(self, session_data: Dict):
         """Store learning session data for analysis"""
+        self.store_learning_sessions([session_data])
+    
+    def store_learning_sessions(self, sessions: Iterable[Dict]):
+        """Store many learning sessions in a single transaction"""
+        rows = [(
+            session_data.get('child_id'),
+            session_data.get('session_date') or clock.now().date(),
+            session_data.get('subject'),
+            session_data.get('skill_area'),
+            session_data.get('performance_score'),
+            session_data.get('time_spent'),
+            session_data.get('difficulty_level'),
+            session_data.get('engagement_score'),
+            session_data.get('mistakes_count'),
+            session_data.get('hints_used')
+        ) for session_data in sessions]
+        
         try:
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO learning_sessions 
-                (child_id, session_date, subject, skill_area, performance_score, 
-                 time_spent, difficulty_level, engagement_score, mistakes_count, hints_used)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session_data.get('child_id'),
-                session_data.get('session_date', datetime.now().date()),
-                session_data.get('subject'),
-                session_data.get('skill_area'),
-                session_data.get('performance_score'),
-                session_data.get('time_spent'),
-                session_data.get('difficulty_level'),
-                session_data.get('engagement_score'),
-                session_data.get('mistakes_count'),
-                session_data.get('hints_used')
-            ))
-            
-            self.conn.commit()
-            
-        except Exception as e:
+            with self._db_write_lock, self.conn:
+                self._insert_cursor.executemany(INSERT_LEARNING_SESSION_SQL, rows)
+        except sqlite3.Error as e:
             print(f"Session data storage failed: {e}")
-    
-    def __del__(self):
-        """Clean up database connection"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
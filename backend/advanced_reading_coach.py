@@ -3,23 +3,302 @@ Advanced AI Reading Coach for Umeed
 Whisper integration, phonics analysis, and adaptive reading support
 """
 
+import asyncio
+import httpx
 import openai
 import os
 import base64
 import json
 import numpy as np
 import sqlite3
-import tempfile
+import io
 import wave
-import librosa
-import phonetics
 import re
+import threading
+import weakref
+from bisect import bisect_right
+from itertools import accumulate
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from array import array
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
-from textstat import flesch_reading_ease, flesch_kincaid_grade
 from difflib import SequenceMatcher
-import requests
-from scipy.spatial.distance import cosine
+
+# phonetics and textstat are imported on first use to keep worker start-up light
+
+try:
+    import hyperscan
+except ImportError:
+    # Hyperscan is optional (x86 only); phonics matching falls back to numba or regex
+    hyperscan = None
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # numba is optional; phonics scanning falls back to Python substring checks
+    HAVE_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+INSERT_READING_SESSION_SQL = '''
+    INSERT INTO reading_sessions 
+    (child_id, text_read, transcription, accuracy_score, fluency_score, 
+     pronunciation_score, reading_speed, mistakes, improvements)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPDATE_READING_GOAL_SQL = '''
+    UPDATE reading_goals 
+    SET current_value = ? 
+    WHERE child_id = ? AND goal_type = ? AND status = 'active'
+'''
+
+# Reading level to grade mappings
+READING_LEVELS = {
+    1: {'grade': 'K-1', 'wpm_target': 30, 'word_length': 3.5},
+    2: {'grade': '1-2', 'wpm_target': 60, 'word_length': 4.0},
+    3: {'grade': '2-3', 'wpm_target': 90, 'word_length': 4.5},
+    4: {'grade': '3-4', 'wpm_target': 120, 'word_length': 5.0},
+    5: {'grade': '4-5', 'wpm_target': 150, 'word_length': 5.5}
+}
+
+# Common sight words by grade level
+SIGHT_WORDS = {
+    1: ['the', 'and', 'a', 'to', 'said', 'you', 'it', 'I', 'of', 'in', 'was', 'is', 'his', 'that', 'he'],
+    2: ['as', 'with', 'for', 'they', 'be', 'at', 'one', 'have', 'this', 'from', 'or', 'had', 'by', 'word', 'but'],
+    3: ['not', 'what', 'all', 'were', 'we', 'when', 'your', 'can', 'each', 'which', 'she', 'do', 'how', 'their', 'if'],
+    4: ['will', 'up', 'other', 'about', 'out', 'many', 'then', 'them', 'these', 'so', 'some', 'her', 'would', 'make', 'like'],
+    5: ['into', 'him', 'has', 'two', 'more', 'very', 'what', 'know', 'just', 'first', 'get', 'over', 'think', 'also', 'back']
+}
+
+# Phonics patterns for targeted practice
+PHONICS_PATTERNS = {
+    'short_vowels': {
+        'patterns': ['a', 'e', 'i', 'o', 'u'],
+        'examples': ['cat', 'bed', 'sit', 'pot', 'cut'],
+        'difficulty': 1
+    },
+    'long_vowels': {
+        'patterns': ['a_e', 'e_e', 'i_e', 'o_e', 'u_e'],
+        'examples': ['cake', 'here', 'bike', 'hope', 'cube'],
+        'difficulty': 2
+    },
+    'consonant_blends': {
+        'patterns': ['bl', 'br', 'cl', 'cr', 'dr', 'fl', 'fr', 'gl', 'gr', 'pl', 'pr', 'sc', 'sk', 'sl', 'sm', 'sn', 'sp', 'st', 'sw', 'tr'],
+        'examples': ['blue', 'tree', 'clap', 'crab', 'drum', 'flag', 'frog', 'glad', 'green', 'play'],
+        'difficulty': 2
+    },
+    'digraphs': {
+        'patterns': ['ch', 'sh', 'th', 'wh', 'ph', 'ck', 'ng'],
+        'examples': ['chair', 'ship', 'think', 'whale', 'phone', 'duck', 'ring'],
+        'difficulty': 3
+    },
+    'vowel_teams': {
+        'patterns': ['ai', 'ay', 'ea', 'ee', 'ie', 'oa', 'ow', 'ue'],
+        'examples': ['rain', 'play', 'read', 'tree', 'pie', 'boat', 'show', 'blue'],
+        'difficulty': 3
+    },
+    'r_controlled': {
+        'patterns': ['ar', 'er', 'ir', 'or', 'ur'],
+        'examples': ['car', 'her', 'bird', 'for', 'turn'],
+        'difficulty': 4
+    }
+}
+
+# Fluency scores from each threshold upwards map to the next level
+FLUENCY_THRESHOLDS = (0.5, 0.7, 0.9)
+FLUENCY_LEVELS = ('beginning', 'developing', 'proficient', 'advanced')
+
+# Everything but word characters and whitespace is stripped before comparing texts
+NON_WORD_RE = re.compile(r'[^\w\s]')
+
+# Sample rate assumed for headerless audio
+SPEECH_SAMPLE_RATE = 16000
+
+# Sessions analyzed at once by analyze_many; keeps batches under the OpenAI rate limit
+ANALYSIS_BATCH_CONCURRENCY = 8
+
+# Double-metaphone codes are memoized process-wide; passages are re-read by many children
+PHONETIC_CACHE_SIZE = 100_000
+PASSAGE_PHONETIC_CACHE_SIZE = 256
+
+# Bigram Jaccard similarity at which a mispronunciation counts as a near-miss
+CLOSE_PRONUNCIATION_SIMILARITY = 0.6
+
+# The OpenAI client retries 429s and 5xx responses, honouring retry-after
+OPENAI_MAX_RETRIES = 5
+
+# Pooled HTTP/2 connections to the OpenAI API, sized for concurrent batch analysis
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+OPENAI_HTTP_TIMEOUT = 60.0
+
+
+@njit(cache=True)
+def scan_phonics_patterns(word_buf, word_off, pat_buf, pat_off, pat_group, word_correct, attempts, correct):
+    """Count, per pattern group, words containing each pattern and how many of those were read correctly"""
+    n_words = word_off.shape[0] - 1
+    n_patterns = pat_off.shape[0] - 1
+    for w in range(n_words):
+        word_start = word_off[w]
+        word_end = word_off[w + 1]
+        for p in range(n_patterns):
+            pat_start = pat_off[p]
+            pat_len = pat_off[p + 1] - pat_start
+            # Patterns are at most a few bytes, so a naive search is fastest
+            for start in range(word_start, word_end - pat_len + 1):
+                k = 0
+                while k < pat_len and word_buf[start + k] == pat_buf[pat_start + k]:
+                    k += 1
+                if k == pat_len:
+                    group = pat_group[p]
+                    attempts[group] += 1
+                    if word_correct[w]:
+                        correct[group] += 1
+                    break
+
+
+def pack_words(words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenated UTF-8 bytes of words plus start offsets (length len(words) + 1)"""
+    encoded = [word.encode() for word in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(word) for word in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def audio_duration(audio_data: bytes) -> float:
+    """Duration in seconds read from the audio header, without decoding samples"""
+    try:
+        with wave.open(io.BytesIO(audio_data)) as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError):
+        pass
+    
+    # Browsers often record ogg/flac/mp3, whose headers soundfile can read
+    try:
+        import soundfile
+        return soundfile.info(io.BytesIO(audio_data)).duration
+    except Exception:
+        # Last resort: 16 kHz 16-bit mono PCM
+        return len(audio_data) / (SPEECH_SAMPLE_RATE * 2)
+
+
+def dmetaphone(word: str) -> Tuple:
+    """Double-metaphone codes of a word"""
+    import phonetics
+    return phonetics.dmetaphone(word)
+
+
+@lru_cache(maxsize=PHONETIC_CACHE_SIZE)
+def word_bigrams(word: str) -> frozenset:
+    """Adjacent byte pairs of a word, each packed into a 16-bit int"""
+    b = word.encode()
+    return frozenset((b[i] << 8) | b[i + 1] for i in range(len(b) - 1))
+
+
+@lru_cache(maxsize=PHONETIC_CACHE_SIZE)
+def phonetic_vector(code: str) -> Dict[str, float]:
+    """Unit-normalized character-bigram counts of a phonetic code, with ^ and $ marking its ends"""
+    padded = f"^{code}$"
+    counts = {}
+    for i in range(len(padded) - 1):
+        bigram = padded[i:i + 2]
+        counts[bigram] = counts.get(bigram, 0) + 1
+    norm = sum(c * c for c in counts.values()) ** 0.5
+    return {bigram: c / norm for bigram, c in counts.items()}
+
+
+def phonetic_cosine(code1: str, code2: str) -> float:
+    """Cosine similarity of two phonetic codes; codes are a few characters, so sparse dicts beat dense vectors"""
+    v1 = phonetic_vector(code1)
+    v2 = phonetic_vector(code2)
+    if len(v1) > len(v2):
+        v1, v2 = v2, v1
+    return min(1.0, sum(weight * v2.get(bigram, 0.0) for bigram, weight in v1.items()))
+
+
+def intern_words(*word_lists: List[str]) -> List[array]:
+    """Map words to small integer ids shared across the lists, so matching hashes ints instead of strings"""
+    vocab = {}
+    return [array('I', [vocab.setdefault(word, len(vocab)) for word in words]) for words in word_lists]
+
+
+def align_words(expected_words: List[str], transcribed_words: List[str]) -> SequenceMatcher:
+    """SequenceMatcher aligning the transcription to the expected words, over interned word ids"""
+    expected_ids, transcribed_ids = intern_words(expected_words, transcribed_words)
+    return SequenceMatcher(None, expected_ids, transcribed_ids)
+
+
+@dataclass
+class AccuracyResult:
+    """Word accuracy of a reading against the expected text"""
+    __slots__ = ('accuracy_score', 'word_accuracy', 'total_words', 'mistakes', 'corrections')
+    accuracy_score: float
+    word_accuracy: int
+    total_words: int
+    mistakes: List[Dict]
+    corrections: List[str]
+
+
+@dataclass
+class FluencyResult:
+    """Reading speed and prosody of a reading"""
+    __slots__ = ('fluency_score', 'reading_speed', 'target_speed', 'prosody_score', 'fluency_level')
+    fluency_score: float
+    reading_speed: float
+    target_speed: int
+    prosody_score: float
+    fluency_level: str
+
+
+@dataclass
+class PronunciationResult:
+    """Words read as phonetically close substitutes, with feedback for each"""
+    __slots__ = ('pronunciation_score', 'pronunciation_issues', 'phonetic_feedback')
+    pronunciation_score: float
+    pronunciation_issues: List[Dict]
+    phonetic_feedback: List[str]
+
+
+@dataclass
+class PhonicsResult:
+    """Phonics pattern mastery over the expected words"""
+    __slots__ = ('patterns_attempted', 'patterns_mastered', 'patterns_struggling', 'recommendations')
+    patterns_attempted: List[Dict]
+    patterns_mastered: List[str]
+    patterns_struggling: List[str]
+    recommendations: List[Dict]
+
+
+@dataclass
+class ReadingSessionResult:
+    """Analysis of one reading session; flattened to the response dict by as_dict"""
+    __slots__ = ('transcription', 'expected_text', 'accuracy', 'fluency', 'pronunciation', 'phonics', 'feedback')
+    transcription: str
+    expected_text: str
+    accuracy: AccuracyResult
+    fluency: FluencyResult
+    pronunciation: PronunciationResult
+    phonics: PhonicsResult
+    feedback: Optional[Dict]
+    
+    def as_dict(self) -> Dict:
+        """Response fields of the session, with phonics nested under phonics_analysis"""
+        return {
+            'transcription': self.transcription,
+            'expected_text': self.expected_text,
+            **asdict(self.accuracy),
+            **asdict(self.fluency),
+            **asdict(self.pronunciation),
+            'phonics_analysis': asdict(self.phonics),
+            'feedback': self.feedback
+        }
+
 
 class AdvancedAIReadingCoach:
     """
@@ -27,7 +306,12 @@ class AdvancedAIReadingCoach:
     """
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self._http = httpx.Client(http2=True, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=self._http)
+        
+        # Async clients per event loop: pooled connections are bound to the loop that opened them
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
         
         # Initialize phonics and reading analysis tools
         self.init_reading_analysis_tools()
@@ -44,21 +328,38 @@ class AdvancedAIReadingCoach:
         # Phonics patterns
         self.phonics_patterns = self._load_phonics_patterns()
         
+        # One alternation per pattern group; the lookahead finds overlapping matches ('str' holds 'st' and 'tr')
+        self.phonics_regexes = [
+            re.compile('(?=(%s))' % '|'.join(map(re.escape, info['patterns'])))
+            for info in self.phonics_patterns.values()
+        ]
+        
+        # Flattened pattern bytes, offsets and group ids for the phonics scan kernel
+        self.phonics_groups = list(self.phonics_patterns)
+        all_patterns = [pattern for info in self.phonics_patterns.values() for pattern in info['patterns']]
+        self.phonics_pattern_buf, self.phonics_pattern_off = pack_words(all_patterns)
+        self.phonics_pattern_group = np.repeat(
+            np.arange(len(self.phonics_groups), dtype=np.int64),
+            [len(info['patterns']) for info in self.phonics_patterns.values()]
+        )
+        
+        # All patterns in one Hyperscan database, scanned once per passage
+        self.phonics_database = self._compile_phonics_database(all_patterns) if hyperscan is not None else None
+        self._phonics_scan_lock = threading.Lock()
+        
     def init_reading_analysis_tools(self):
         """Initialize reading analysis and phonics tools"""
         try:
             # Phonetics encoder for pronunciation analysis
-            self.phonetic_encoder = phonetics.dmetaphone
+            self.phonetic_encoder = lru_cache(maxsize=PHONETIC_CACHE_SIZE)(dmetaphone)
             
-            # Reading difficulty metrics
-            self.difficulty_metrics = {
-                'flesch_ease': flesch_reading_ease,
-                'flesch_kincaid': flesch_kincaid_grade
-            }
+            # Expected passage text -> phonetic codes of its words
+            self._passage_phonetic_cache: OrderedDict = OrderedDict()
+            self._passage_phonetic_lock = threading.Lock()
             
             # Speech analysis parameters
             self.speech_params = {
-                'sample_rate': 16000,
+                'sample_rate': SPEECH_SAMPLE_RATE,
                 'hop_length': 512,
                 'n_mfcc': 13
             }
@@ -66,11 +367,32 @@ class AdvancedAIReadingCoach:
         except Exception as e:
             print(f"Warning: Could not initialize all reading analysis tools: {e}")
     
+    @cached_property
+    def difficulty_metrics(self) -> Dict:
+        """Reading difficulty metrics"""
+        from textstat import flesch_reading_ease, flesch_kincaid_grade
+        return {
+            'flesch_ease': flesch_reading_ease,
+            'flesch_kincaid': flesch_kincaid_grade
+        }
+    
     def init_database(self):
         """Initialize reading progress database"""
         self.conn = sqlite3.connect('reading_coach.db', check_same_thread=False)
+        self.conn.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+        ''')
         cursor = self.conn.cursor()
         
+        # Session rows and goal updates waiting for flush_pending
+        self._pending_sessions = []
+        self._pending_goals = []
+        self._pending_lock = threading.Lock()
+        self._db_write_lock = threading.Lock()
+        
         # Reading sessions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS reading_sessions (
@@ -120,60 +442,39 @@ class AdvancedAIReadingCoach:
         
         self.conn.commit()
     
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """AsyncOpenAI client for the running event loop, created on first use there and shared until aclose"""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = openai.AsyncOpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=httpx.AsyncClient(http2=True, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+                )
+                self._async_clients[loop] = client
+        return client
+    
+    async def _aclose_async_client(self):
+        """Close the running event loop's async client and its connection pool"""
+        with self._async_clients_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+    
     def _load_reading_level_mappings(self) -> Dict:
         """Load reading level to grade mappings"""
-        return {
-            1: {'grade': 'K-1', 'wpm_target': 30, 'word_length': 3.5},
-            2: {'grade': '1-2', 'wpm_target': 60, 'word_length': 4.0},
-            3: {'grade': '2-3', 'wpm_target': 90, 'word_length': 4.5},
-            4: {'grade': '3-4', 'wpm_target': 120, 'word_length': 5.0},
-            5: {'grade': '4-5', 'wpm_target': 150, 'word_length': 5.5}
-        }
+        return READING_LEVELS
     
     def _load_sight_words(self) -> Dict:
         """Load sight words by grade level"""
-        return {
-            1: ['the', 'and', 'a', 'to', 'said', 'you', 'it', 'I', 'of', 'in', 'was', 'is', 'his', 'that', 'he'],
-            2: ['as', 'with', 'for', 'they', 'be', 'at', 'one', 'have', 'this', 'from', 'or', 'had', 'by', 'word', 'but'],
-            3: ['not', 'what', 'all', 'were', 'we', 'when', 'your', 'can', 'each', 'which', 'she', 'do', 'how', 'their', 'if'],
-            4: ['will', 'up', 'other', 'about', 'out', 'many', 'then', 'them', 'these', 'so', 'some', 'her', 'would', 'make', 'like'],
-            5: ['into', 'him', 'has', 'two', 'more', 'very', 'what', 'know', 'just', 'first', 'get', 'over', 'think', 'also', 'back']
-        }
+        return SIGHT_WORDS
     
     def _load_phonics_patterns(self) -> Dict:
         """Load phonics patterns for targeted practice"""
-        return {
-            'short_vowels': {
-                'patterns': ['a', 'e', 'i', 'o', 'u'],
-                'examples': ['cat', 'bed', 'sit', 'pot', 'cut'],
-                'difficulty': 1
-            },
-            'long_vowels': {
-                'patterns': ['a_e', 'e_e', 'i_e', 'o_e', 'u_e'],
-                'examples': ['cake', 'here', 'bike', 'hope', 'cube'],
-                'difficulty': 2
-            },
-            'consonant_blends': {
-                'patterns': ['bl', 'br', 'cl', 'cr', 'dr', 'fl', 'fr', 'gl', 'gr', 'pl', 'pr', 'sc', 'sk', 'sl', 'sm', 'sn', 'sp', 'st', 'sw', 'tr'],
-                'examples': ['blue', 'tree', 'clap', 'crab', 'drum', 'flag', 'frog', 'glad', 'green', 'play'],
-                'difficulty': 2
-            },
-            'digraphs': {
-                'patterns': ['ch', 'sh', 'th', 'wh', 'ph', 'ck', 'ng'],
-                'examples': ['chair', 'ship', 'think', 'whale', 'phone', 'duck', 'ring'],
-                'difficulty': 3
-            },
-            'vowel_teams': {
-                'patterns': ['ai', 'ay', 'ea', 'ee', 'ie', 'oa', 'ow', 'ue'],
-                'examples': ['rain', 'play', 'read', 'tree', 'pie', 'boat', 'show', 'blue'],
-                'difficulty': 3
-            },
-            'r_controlled': {
-                'patterns': ['ar', 'er', 'ir', 'or', 'ur'],
-                'examples': ['car', 'her', 'bird', 'for', 'turn'],
-                'difficulty': 4
-            }
-        }
+        return PHONICS_PATTERNS
     
     def analyze_reading_comprehensive(self, audio_base64: str, expected_text: str, child_profile: Dict) -> Dict:
         """
@@ -183,101 +484,161 @@ class AdvancedAIReadingCoach:
             # Decode and process audio
             audio_data = base64.b64decode(audio_base64)
             
-            # Save audio to temporary file for Whisper processing
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                tmp_file.write(audio_data)
-                tmp_file_path = tmp_file.name
-            
             # Whisper transcription with detailed analysis
-            transcription_result = self._transcribe_with_whisper(tmp_file_path)
-            
-            # Clean up temporary file
-            os.unlink(tmp_file_path)
+            transcription_result = self._transcribe_with_whisper(audio_data)
             
             if not transcription_result['success']:
                 return transcription_result
             
-            transcribed_text = transcription_result['text']
-            
             # Comprehensive reading analysis
-            analysis_results = {
-                'transcription': transcribed_text,
-                'expected_text': expected_text
-            }
+            session = self._analyze_transcription(audio_data, transcription_result['text'], expected_text, child_profile)
             
-            # Accuracy analysis
-            accuracy_analysis = self._analyze_reading_accuracy(transcribed_text, expected_text)
-            analysis_results.update(accuracy_analysis)
+            # Generate personalized feedback
+            session.feedback = self._generate_comprehensive_feedback(session, child_profile)
             
-            # Fluency analysis
-            fluency_analysis = self._analyze_reading_fluency(audio_data, transcribed_text, expected_text)
-            analysis_results.update(fluency_analysis)
+            # Store session data and update reading goals
+            self._queue_session(child_profile['id'], session)
+            self.flush_pending()
             
-            # Pronunciation analysis
-            pronunciation_analysis = self._analyze_pronunciation(transcribed_text, expected_text, child_profile)
-            analysis_results.update(pronunciation_analysis)
+            return {
+                'success': True,
+                **session.as_dict()
+            }
             
-            # Phonics analysis
-            phonics_analysis = self._analyze_phonics_patterns(transcribed_text, expected_text, child_profile)
-            analysis_results.update(phonics_analysis)
+        except Exception as e:
+            return {'success': False, 'error': f'Comprehensive reading analysis failed: {str(e)}'}
+    
+    async def analyze_reading_comprehensive_async(self, audio_base64: str, expected_text: str, child_profile: Dict,
+                                                  flush: bool = True) -> Dict:
+        """Async variant of analyze_reading_comprehensive; with flush=False the session stays queued for flush_pending"""
+        try:
+            audio_data = base64.b64decode(audio_base64)
             
-            # Generate personalized feedback
-            feedback = self._generate_comprehensive_feedback(analysis_results, child_profile)
-            analysis_results['feedback'] = feedback
+            transcription_result = await self._atranscribe_with_whisper(audio_data)
+            if not transcription_result['success']:
+                return transcription_result
             
-            # Store session data
-            self._store_reading_session(child_profile['id'], analysis_results)
+            # The local analyses are cheap; only the two OpenAI round trips are awaited
+            session = self._analyze_transcription(audio_data, transcription_result['text'], expected_text, child_profile)
+            session.feedback = await self._agenerate_comprehensive_feedback(session, child_profile)
             
-            # Update reading goals
-            self._update_reading_goals(child_profile['id'], analysis_results)
+            self._queue_session(child_profile['id'], session)
+            if flush:
+                # SQLite commits block, so they run off the event loop
+                await asyncio.to_thread(self.flush_pending)
             
             return {
                 'success': True,
-                **analysis_results
+                **session.as_dict()
             }
             
         except Exception as e:
             return {'success': False, 'error': f'Comprehensive reading analysis failed: {str(e)}'}
     
-    def _transcribe_with_whisper(self, audio_file_path: str) -> Dict:
-        """Transcribe audio using OpenAI Whisper"""
+    async def analyze_many(self, sessions: List[Tuple[str, str, Dict]]) -> List[Dict]:
+        """Analyze (audio_base64, expected_text, child_profile) sessions concurrently"""
+        semaphore = asyncio.Semaphore(ANALYSIS_BATCH_CONCURRENCY)
+        
+        async def analyze(audio_base64: str, expected_text: str, child_profile: Dict) -> Dict:
+            async with semaphore:
+                return await self.analyze_reading_comprehensive_async(audio_base64, expected_text, child_profile, flush=False)
+        
         try:
-            with open(audio_file_path, 'rb') as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="verbose_json",
-                    timestamp_granularities=["word"]
-                )
+            return await asyncio.gather(*(analyze(*session) for session in sessions))
+        finally:
+            # Every finished session of the batch is written in one transaction, even if it was cancelled
+            await asyncio.to_thread(self.flush_pending)
+    
+    def _analyze_transcription(self, audio_data: bytes, transcribed_text: str, expected_text: str,
+                               child_profile: Dict) -> ReadingSessionResult:
+        """Accuracy, fluency, pronunciation and phonics analysis of a transcribed reading"""
+        # Accuracy, pronunciation and phonics analysis from one word alignment
+        accuracy, pronunciation, phonics = self._analyze_words(transcribed_text, expected_text, child_profile)
+        
+        # Fluency analysis
+        fluency = self._analyze_reading_fluency(audio_data, transcribed_text, expected_text)
+        
+        return ReadingSessionResult(transcribed_text, expected_text, accuracy, fluency, pronunciation, phonics, None)
+    
+    def _transcribe_with_whisper(self, audio_data: bytes) -> Dict:
+        """Transcribe in-memory audio using OpenAI Whisper"""
+        try:
+            transcript = self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=("audio.wav", audio_data, "audio/wav"),
+                response_format="verbose_json",
+                timestamp_granularities=["word"]
+            )
             
-            return {
-                'success': True,
-                'text': transcript.text,
-                'words': getattr(transcript, 'words', []),
-                'duration': getattr(transcript, 'duration', 0),
-                'language': getattr(transcript, 'language', 'en')
-            }
+            return self._transcription_result(transcript)
             
         except Exception as e:
             print(f"Whisper transcription failed: {e}")
             return {'success': False, 'error': f'Transcription failed: {str(e)}'}
     
-    def _analyze_reading_accuracy(self, transcribed: str, expected: str) -> Dict:
-        """Analyze reading accuracy using sequence matching"""
+    async def _atranscribe_with_whisper(self, audio_data: bytes) -> Dict:
+        """Async Whisper transcription of in-memory audio"""
         try:
-            # Normalize texts for comparison
-            transcribed_words = self._normalize_text(transcribed).split()
-            expected_words = self._normalize_text(expected).split()
+            transcript = await self.async_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=("audio.wav", audio_data, "audio/wav"),
+                response_format="verbose_json",
+                timestamp_granularities=["word"]
+            )
             
-            # Calculate accuracy using sequence matching
-            matcher = SequenceMatcher(None, expected_words, transcribed_words)
-            accuracy_score = matcher.ratio()
+            return self._transcription_result(transcript)
             
+        except Exception as e:
+            print(f"Whisper transcription failed: {e}")
+            return {'success': False, 'error': f'Transcription failed: {str(e)}'}
+    
+    def _transcription_result(self, transcript) -> Dict:
+        """Transcription result dict from a verbose Whisper response"""
+        return {
+            'success': True,
+            'text': transcript.text,
+            'words': getattr(transcript, 'words', []),
+            'duration': getattr(transcript, 'duration', 0),
+            'language': getattr(transcript, 'language', 'en')
+        }
+    
+    def _analyze_words(self, transcribed: str, expected: str,
+                       child_profile: Dict) -> Tuple[AccuracyResult, PronunciationResult, PhonicsResult]:
+        """Accuracy, pronunciation and phonics analysis from a single word alignment"""
+        # Tokenize once and align once
+        transcribed_words = self._normalize_text(transcribed).split()
+        expected_words = self._normalize_text(expected).split()
+        matcher = align_words(expected_words, transcribed_words)
+        opcodes = matcher.get_opcodes()
+        
+        # Walk the alignment: one-to-one substitutions are pronunciation candidates,
+        # and an expected word counts as read correctly only inside an equal block
+        mismatched = []
+        word_correct = [False] * len(expected_words)
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                word_correct[i1:i2] = [True] * (i2 - i1)
+            elif tag == 'replace' and i2 - i1 == j2 - j1:
+                mismatched.extend(zip(range(i1, i2), transcribed_words[j1:j2]))
+        
+        return (
+            self._score_accuracy(expected_words, transcribed_words, matcher.ratio(), opcodes),
+            self._score_pronunciation(expected_words, mismatched, child_profile),
+            self._score_phonics(expected_words, word_correct, child_profile)
+        )
+    
+    def _analyze_reading_accuracy(self, transcribed: str, expected: str) -> AccuracyResult:
+        """Analyze reading accuracy using sequence matching"""
+        return self._analyze_words(transcribed, expected, {})[0]
+    
+    def _score_accuracy(self, expected_words: List[str], transcribed_words: List[str],
+                        accuracy_score: float, opcodes: List[Tuple]) -> AccuracyResult:
+        """Accuracy score, mistakes and corrections from a word alignment"""
+        try:
             # Identify specific mistakes
             mistakes = []
             corrections = []
             
-            opcodes = matcher.get_opcodes()
             for tag, i1, i2, j1, j2 in opcodes:
                 if tag == 'replace':
                     expected_segment = ' '.join(expected_words[i1:i2])
@@ -314,32 +675,27 @@ class AdvancedAIReadingCoach:
                 elif mistake['type'] == 'insertion':
                     corrections.append(f"The word '{mistake['actual']}' isn't in the text")
             
-            return {
-                'accuracy_score': accuracy_score,
-                'word_accuracy': len(expected_words) - len(mistakes),
-                'total_words': len(expected_words),
-                'mistakes': mistakes,
-                'corrections': corrections[:5]  # Limit to top 5 corrections
-            }
+            return AccuracyResult(
+                accuracy_score,
+                len(expected_words) - len(mistakes),
+                len(expected_words),
+                mistakes,
+                corrections[:5]  # Limit to top 5 corrections
+            )
             
         except Exception as e:
             print(f"Accuracy analysis failed: {e}")
-            return {
-                'accuracy_score': 0.5,
-                'mistakes': [],
-                'corrections': []
-            }
+            return AccuracyResult(0.5, 0, len(expected_words), [], [])
     
-    def _analyze_reading_fluency(self, audio_data: bytes, transcribed: str, expected: str) -> Dict:
+    def _analyze_reading_fluency(self, audio_data: bytes, transcribed: str, expected: str) -> FluencyResult:
         """Analyze reading fluency including speed and prosody"""
         try:
             # Calculate reading speed (words per minute)
             transcribed_words = len(transcribed.split())
             expected_words = len(expected.split())
             
-            # Estimate audio duration (this would need actual audio processing)
-            # For now, use a simple heuristic
-            estimated_duration = max(len(audio_data) / 16000, 1)  # Assuming 16kHz sample rate
+            # Audio duration from the container header, never shorter than a second
+            estimated_duration = max(audio_duration(audio_data), 1)
             
             wpm = (transcribed_words / estimated_duration) * 60
             
@@ -353,21 +709,17 @@ class AdvancedAIReadingCoach:
             # Overall fluency combining speed and prosody
             overall_fluency = (fluency_score * 0.7 + prosody_score * 0.3)
             
-            return {
-                'fluency_score': overall_fluency,
-                'reading_speed': wpm,
-                'target_speed': target_wpm,
-                'prosody_score': prosody_score,
-                'fluency_level': self._classify_fluency_level(overall_fluency)
-            }
+            return FluencyResult(
+                overall_fluency,
+                wpm,
+                target_wpm,
+                prosody_score,
+                self._classify_fluency_level(overall_fluency)
+            )
             
         except Exception as e:
             print(f"Fluency analysis failed: {e}")
-            return {
-                'fluency_score': 0.5,
-                'reading_speed': 60,
-                'fluency_level': 'developing'
-            }
+            return FluencyResult(0.5, 60, 60, 0.7, 'developing')
     
     def _analyze_prosody(self, audio_data: bytes) -> float:
         """Analyze prosody features in reading"""
@@ -381,78 +733,77 @@ class AdvancedAIReadingCoach:
     
     def _classify_fluency_level(self, fluency_score: float) -> str:
         """Classify fluency level based on score"""
-        if fluency_score >= 0.9:
-            return 'advanced'
-        elif fluency_score >= 0.7:
-            return 'proficient'
-        elif fluency_score >= 0.5:
-            return 'developing'
-        else:
-            return 'beginning'
+        return FLUENCY_LEVELS[bisect_right(FLUENCY_THRESHOLDS, fluency_score)]
     
-    def _analyze_pronunciation(self, transcribed: str, expected: str, child_profile: Dict) -> Dict:
+    def _analyze_pronunciation(self, transcribed: str, expected: str, child_profile: Dict) -> PronunciationResult:
         """Analyze pronunciation accuracy and provide targeted feedback"""
+        return self._analyze_words(transcribed, expected, child_profile)[1]
+    
+    def _score_pronunciation(self, expected_words: List[str], mismatched: List[Tuple[int, str]],
+                             child_profile: Dict) -> PronunciationResult:
+        """Pronunciation score and feedback for (expected position, word read instead) pairs"""
         try:
             pronunciation_issues = []
             phonetic_feedback = []
             
             # Compare phonetic representations
-            transcribed_words = transcribed.lower().split()
-            expected_words = expected.lower().split()
+            expected_phonetics = self._passage_phonetics(expected_words)
             
             # Identify pronunciation problems
-            for i, (expected_word, transcribed_word) in enumerate(zip(expected_words, transcribed_words)):
-                if expected_word != transcribed_word:
-                    # Check if it's a pronunciation issue vs comprehension issue
-                    expected_phonetic = self.phonetic_encoder(expected_word)
-                    transcribed_phonetic = self.phonetic_encoder(transcribed_word)
-                    
-                    # Calculate phonetic similarity
-                    phonetic_similarity = self._calculate_phonetic_similarity(expected_phonetic, transcribed_phonetic)
+            for i, transcribed_word in mismatched:
+                expected_word = expected_words[i]
+                
+                # Check if it's a pronunciation issue vs comprehension issue
+                expected_phonetic = expected_phonetics[i]
+                transcribed_phonetic = self.phonetic_encoder(transcribed_word)
+                
+                # Calculate phonetic similarity
+                phonetic_similarity = self._calculate_phonetic_similarity(expected_phonetic, transcribed_phonetic)
+                
+                if phonetic_similarity > 0.5:  # Likely pronunciation issue
+                    pronunciation_issues.append({
+                        'word': expected_word,
+                        'pronounced_as': transcribed_word,
+                        'phonetic_similarity': phonetic_similarity,
+                        'position': i
+                    })
                     
-                    if phonetic_similarity > 0.5:  # Likely pronunciation issue
-                        pronunciation_issues.append({
-                            'word': expected_word,
-                            'pronounced_as': transcribed_word,
-                            'phonetic_similarity': phonetic_similarity,
-                            'position': i
-                        })
-                        
-                        # Generate specific pronunciation feedback
-                        feedback = self._generate_pronunciation_feedback(expected_word, transcribed_word, child_profile)
-                        phonetic_feedback.append(feedback)
+                    # Generate specific pronunciation feedback
+                    feedback = self._generate_pronunciation_feedback(expected_word, transcribed_word, child_profile)
+                    phonetic_feedback.append(feedback)
             
             # Calculate overall pronunciation score
             pronunciation_score = 1.0 - (len(pronunciation_issues) / max(len(expected_words), 1))
             
-            return {
-                'pronunciation_score': pronunciation_score,
-                'pronunciation_issues': pronunciation_issues,
-                'phonetic_feedback': phonetic_feedback
-            }
+            return PronunciationResult(pronunciation_score, pronunciation_issues, phonetic_feedback)
             
         except Exception as e:
             print(f"Pronunciation analysis failed: {e}")
-            return {
-                'pronunciation_score': 0.7,
-                'pronunciation_issues': [],
-                'phonetic_feedback': []
-            }
+            return PronunciationResult(0.7, [], [])
+    
+    def _passage_phonetics(self, expected_words: List[str]) -> Tuple:
+        """Phonetic codes for every word of an expected passage, cached per passage"""
+        key = ' '.join(expected_words)
+        with self._passage_phonetic_lock:
+            codes = self._passage_phonetic_cache.get(key)
+            if codes is not None:
+                self._passage_phonetic_cache.move_to_end(key)
+                return codes
+        
+        codes = tuple(self.phonetic_encoder(word) for word in expected_words)
+        with self._passage_phonetic_lock:
+            self._passage_phonetic_cache[key] = codes
+            while len(self._passage_phonetic_cache) > PASSAGE_PHONETIC_CACHE_SIZE:
+                self._passage_phonetic_cache.popitem(last=False)
+        return codes
     
     def _calculate_phonetic_similarity(self, phonetic1: Tuple, phonetic2: Tuple) -> float:
-        """Calculate similarity between phonetic representations"""
+        """Best cosine similarity between the character-bigram vectors of the two words' phonetic codes"""
         try:
-            # Simple similarity based on matching phonetic codes
-            matches = 0
-            total = 0
-            
-            for p1, p2 in zip(phonetic1, phonetic2):
-                if p1 and p2:  # Both have phonetic codes
-                    total += 1
-                    if p1 == p2:
-                        matches += 1
-            
-            return matches / total if total > 0 else 0.0
+            return max(
+                (phonetic_cosine(p1, p2) for p1 in phonetic1 if p1 for p2 in phonetic2 if p2),
+                default=0.0
+            )
             
         except Exception as e:
             return 0.0
@@ -460,58 +811,45 @@ class AdvancedAIReadingCoach:
     def _generate_pronunciation_feedback(self, expected_word: str, pronounced_word: str, child_profile: Dict) -> str:
         """Generate specific pronunciation feedback"""
         try:
+            # Near-misses by bigram overlap get encouragement rather than a correction
+            expected_bigrams = word_bigrams(expected_word)
+            pronounced_bigrams = word_bigrams(pronounced_word)
+            union = expected_bigrams | pronounced_bigrams
+            similarity = len(expected_bigrams & pronounced_bigrams) / len(union) if union else 1.0
+            if similarity >= CLOSE_PRONUNCIATION_SIMILARITY:
+                return f"Great try! Keep practicing '{expected_word}' - you're very close!"
+            
             # Identify the type of pronunciation error
-            if len(expected_word) != len(pronounced_word):
-                if len(expected_word) > len(pronounced_word):
-                    return f"Remember to pronounce all the sounds in '{expected_word}' - try breaking it into syllables"
-                else:
-                    return f"'{expected_word}' is shorter than you pronounced - try saying it more simply"
+            if len(expected_word) > len(pronounced_word):
+                return f"Remember to pronounce all the sounds in '{expected_word}' - try breaking it into syllables"
+            if len(expected_word) < len(pronounced_word):
+                return f"'{expected_word}' is shorter than you pronounced - try saying it more simply"
             
-            # Find specific sound differences
-            different_positions = []
-            for i, (e_char, p_char) in enumerate(zip(expected_word, pronounced_word)):
+            # Find the first sound difference
+            for e_char, p_char in zip(expected_word, pronounced_word):
                 if e_char != p_char:
-                    different_positions.append(i)
-            
-            if different_positions:
-                pos = different_positions[0]
-                expected_sound = expected_word[pos]
-                return f"Focus on the '{expected_sound}' sound in '{expected_word}' - it makes a different sound than in '{pronounced_word}'"
+                    return f"Focus on the '{e_char}' sound in '{expected_word}' - it makes a different sound than in '{pronounced_word}'"
             
             return f"Great try! Keep practicing '{expected_word}' - you're very close!"
             
         except Exception as e:
             return f"Keep practicing '{expected_word}' - you're doing well!"
     
-    def _analyze_phonics_patterns(self, transcribed: str, expected: str, child_profile: Dict) -> Dict:
+    def _analyze_phonics_patterns(self, transcribed: str, expected: str, child_profile: Dict) -> PhonicsResult:
         """Analyze phonics patterns and identify areas for improvement"""
+        return self._analyze_words(transcribed, expected, child_profile)[2]
+    
+    def _score_phonics(self, words: List[str], word_correct: List[bool], child_profile: Dict) -> PhonicsResult:
+        """Phonics mastery summary for the scored expected words and whether each was read correctly"""
         try:
-            phonics_analysis = {
-                'patterns_attempted': [],
-                'patterns_mastered': [],
-                'patterns_struggling': [],
-                'recommendations': []
-            }
+            phonics_analysis = PhonicsResult([], [], [], [])
             
-            # Analyze words in the text for phonics patterns
-            expected_words = expected.lower().split()
-            transcribed_words = transcribed.lower().split()
+            attempts, corrects = self._count_phonics_patterns(words, word_correct)
             
-            for pattern_name, pattern_info in self.phonics_patterns.items():
-                patterns = pattern_info['patterns']
-                attempted = 0
-                correct = 0
-                
-                for expected_word, transcribed_word in zip(expected_words, transcribed_words):
-                    for pattern in patterns:
-                        if pattern in expected_word:
-                            attempted += 1
-                            if expected_word == transcribed_word:
-                                correct += 1
-                
+            for pattern_name, attempted, correct in zip(self.phonics_groups, attempts, corrects):
                 if attempted > 0:
                     success_rate = correct / attempted
-                    phonics_analysis['patterns_attempted'].append({
+                    phonics_analysis.patterns_attempted.append({
                         'pattern': pattern_name,
                         'attempts': attempted,
                         'correct': correct,
@@ -519,20 +857,87 @@ class AdvancedAIReadingCoach:
                     })
                     
                     if success_rate >= 0.8:
-                        phonics_analysis['patterns_mastered'].append(pattern_name)
+                        phonics_analysis.patterns_mastered.append(pattern_name)
                     elif success_rate < 0.5:
-                        phonics_analysis['patterns_struggling'].append(pattern_name)
+                        phonics_analysis.patterns_struggling.append(pattern_name)
             
             # Generate phonics recommendations
-            for struggling_pattern in phonics_analysis['patterns_struggling']:
+            for struggling_pattern in phonics_analysis.patterns_struggling:
                 recommendation = self._generate_phonics_recommendation(struggling_pattern, child_profile)
-                phonics_analysis['recommendations'].append(recommendation)
+                phonics_analysis.recommendations.append(recommendation)
             
-            return {'phonics_analysis': phonics_analysis}
+            return phonics_analysis
             
         except Exception as e:
             print(f"Phonics analysis failed: {e}")
-            return {'phonics_analysis': {'patterns_attempted': [], 'recommendations': []}}
+            return PhonicsResult([], [], [], [])
+    
+    def _count_phonics_patterns(self, words: List[str], word_correct: List[bool]) -> Tuple[List[int], List[int]]:
+        """Per pattern group: pattern occurrences in the words and how many were read correctly"""
+        n_groups = len(self.phonics_groups)
+        
+        if self.phonics_database is not None:
+            return self._scan_phonics_passage(words, word_correct)
+        
+        if not HAVE_NUMBA:
+            attempts = [0] * n_groups
+            corrects = [0] * n_groups
+            for word, correct in zip(words, word_correct):
+                for group, regex in enumerate(self.phonics_regexes):
+                    # Each distinct pattern in the word counts once
+                    found = len(set(regex.findall(word)))
+                    if found:
+                        attempts[group] += found
+                        if correct:
+                            corrects[group] += found
+            return attempts, corrects
+        
+        word_buf, word_off = pack_words(words)
+        attempts = np.zeros(n_groups, dtype=np.int64)
+        corrects = np.zeros(n_groups, dtype=np.int64)
+        scan_phonics_patterns(word_buf, word_off, self.phonics_pattern_buf, self.phonics_pattern_off,
+                              self.phonics_pattern_group, np.array(word_correct, dtype=np.bool_), attempts, corrects)
+        return attempts.tolist(), corrects.tolist()
+    
+    def _compile_phonics_database(self, patterns: List[str]):
+        """Hyperscan database over every phonics pattern, match ids being pattern indices"""
+        try:
+            database = hyperscan.Database()
+            database.compile(
+                expressions=[re.escape(pattern).encode() for pattern in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(patterns)
+            )
+            return database
+        except Exception as e:
+            print(f"Hyperscan phonics database unavailable: {e}")
+            return None
+    
+    def _scan_phonics_passage(self, words: List[str], word_correct: List[bool]) -> Tuple[List[int], List[int]]:
+        """Phonics pattern counts from a single Hyperscan pass over the scored words"""
+        n_groups = len(self.phonics_groups)
+        encoded = [word.encode() for word in words]
+        word_starts = list(accumulate((len(word) + 1 for word in encoded[:-1]), initial=0))
+        
+        # Patterns never span the separating space, so each match lies inside one word
+        found = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            found.add((bisect_right(word_starts, start) - 1, pattern_id))
+        
+        with self._phonics_scan_lock:
+            self.phonics_database.scan(b' '.join(encoded), match_event_handler=on_match)
+        
+        pattern_group = self.phonics_pattern_group
+        attempts = [0] * n_groups
+        corrects = [0] * n_groups
+        for word, pattern_id in found:
+            group = pattern_group[pattern_id]
+            attempts[group] += 1
+            if word_correct[word]:
+                corrects[group] += 1
+        return attempts, corrects
     
     def _generate_phonics_recommendation(self, pattern_name: str, child_profile: Dict) -> Dict:
         """Generate specific phonics practice recommendations"""
@@ -550,11 +955,45 @@ class AdvancedAIReadingCoach:
             ]
         }
     
-    def _generate_comprehensive_feedback(self, analysis_results: Dict, child_profile: Dict) -> Dict:
+    def _generate_comprehensive_feedback(self, session: ReadingSessionResult, child_profile: Dict) -> Dict:
         """Generate comprehensive, personalized feedback"""
         try:
-            # Build comprehensive prompt for GPT-4
-            prompt = f"""
+            response = self.client.chat.completions.create(
+                **self._feedback_request(session, child_profile)
+            )
+            return self._parse_feedback(response, session, child_profile)
+
+        except Exception as e:
+            print(f"Comprehensive feedback generation failed: {e}")
+            return self._generate_fallback_feedback(session, child_profile)
+    
+    async def _agenerate_comprehensive_feedback(self, session: ReadingSessionResult, child_profile: Dict) -> Dict:
+        """Async variant of _generate_comprehensive_feedback"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                **self._feedback_request(session, child_profile)
+            )
+            return self._parse_feedback(response, session, child_profile)
+
+        except Exception as e:
+            print(f"Comprehensive feedback generation failed: {e}")
+            return self._generate_fallback_feedback(session, child_profile)
+    
+    def _feedback_request(self, session: ReadingSessionResult, child_profile: Dict) -> Dict:
+        """Chat completion arguments for session feedback"""
+        return {
+            'model': "gpt-4",
+            'messages': [
+                {"role": "system", "content": "You are an expert reading coach specializing in children with learning differences. Provide supportive, specific, and actionable feedback."},
+                {"role": "user", "content": self._feedback_prompt(session, child_profile)}
+            ],
+            'max_tokens': 400,
+            'temperature': 0.7
+        }
+    
+    def _feedback_prompt(self, session: ReadingSessionResult, child_profile: Dict) -> str:
+        """Build comprehensive prompt for GPT-4"""
+        return f"""
             Generate personalized reading feedback for a child with learning differences.
 
             Child Profile:
@@ -565,15 +1004,15 @@ class AdvancedAIReadingCoach:
             - Interests: {', '.join(child_profile.get('interests', []))}
 
             Reading Session Results:
-            - Accuracy Score: {analysis_results.get('accuracy_score', 0.5):.1%}
-            - Fluency Score: {analysis_results.get('fluency_score', 0.5):.1%}
-            - Pronunciation Score: {analysis_results.get('pronunciation_score', 0.5):.1%}
-            - Reading Speed: {analysis_results.get('reading_speed', 60)} WPM
-            - Mistakes: {len(analysis_results.get('mistakes', []))}
+            - Accuracy Score: {session.accuracy.accuracy_score:.1%}
+            - Fluency Score: {session.fluency.fluency_score:.1%}
+            - Pronunciation Score: {session.pronunciation.pronunciation_score:.1%}
+            - Reading Speed: {session.fluency.reading_speed} WPM
+            - Mistakes: {len(session.accuracy.mistakes)}
 
             Specific Issues:
-            - Pronunciation Issues: {len(analysis_results.get('pronunciation_issues', []))}
-            - Phonics Patterns Struggling: {', '.join(analysis_results.get('phonics_analysis', {}).get('patterns_struggling', []))}
+            - Pronunciation Issues: {len(session.pronunciation.pronunciation_issues)}
+            - Phonics Patterns Struggling: {', '.join(session.phonics.patterns_struggling)}
 
             Generate feedback that:
             1. Celebrates strengths and progress
@@ -585,34 +1024,21 @@ class AdvancedAIReadingCoach:
 
             Format as JSON with: strengths, areas_for_improvement, next_steps, encouragement
             """
-
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert reading coach specializing in children with learning differences. Provide supportive, specific, and actionable feedback."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.7
-            )
-
-            feedback_text = response.choices[0].message.content or ""
-            
-            try:
-                feedback_json = json.loads(feedback_text)
-                return feedback_json
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                return self._generate_fallback_feedback(analysis_results, child_profile)
-
-        except Exception as e:
-            print(f"Comprehensive feedback generation failed: {e}")
-            return self._generate_fallback_feedback(analysis_results, child_profile)
     
-    def _generate_fallback_feedback(self, analysis_results: Dict, child_profile: Dict) -> Dict:
+    def _parse_feedback(self, response, session: ReadingSessionResult, child_profile: Dict) -> Dict:
+        """Feedback JSON from a chat completion, or the fallback if it does not parse"""
+        feedback_text = response.choices[0].message.content or ""
+        
+        try:
+            return json.loads(feedback_text)
+        except json.JSONDecodeError:
+            # Fallback if JSON parsing fails
+            return self._generate_fallback_feedback(session, child_profile)
+    
+    def _generate_fallback_feedback(self, session: ReadingSessionResult, child_profile: Dict) -> Dict:
         """Generate fallback feedback if AI generation fails"""
         child_name = child_profile.get('name', 'friend')
-        accuracy = analysis_results.get('accuracy_score', 0.5)
+        accuracy = session.accuracy.accuracy_score
         
         strengths = []
         improvements = []
@@ -625,7 +1051,7 @@ class AdvancedAIReadingCoach:
         else:
             improvements.append("Focus on reading each word carefully")
         
-        fluency = analysis_results.get('fluency_score', 0.5)
+        fluency = session.fluency.fluency_score
         if fluency >= 0.7:
             strengths.append("Great reading fluency!")
         else:
@@ -833,66 +1259,70 @@ class AdvancedAIReadingCoach:
         else:
             return 'stable'
     
-    def _store_reading_session(self, child_id: str, analysis_results: Dict):
-        """Store reading session data"""
-        try:
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO reading_sessions 
-                (child_id, text_read, transcription, accuracy_score, fluency_score, 
-                 pronunciation_score, reading_speed, mistakes, improvements)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                child_id,
-                analysis_results.get('expected_text', ''),
-                analysis_results.get('transcription', ''),
-                analysis_results.get('accuracy_score', 0),
-                analysis_results.get('fluency_score', 0),
-                analysis_results.get('pronunciation_score', 0),
-                analysis_results.get('reading_speed', 0),
-                json.dumps(analysis_results.get('mistakes', [])),
-                json.dumps(analysis_results.get('feedback', {}))
-            ))
-            
-            self.conn.commit()
-            
-        except Exception as e:
-            print(f"Session storage failed: {e}")
+    def _queue_session(self, child_id: str, session: ReadingSessionResult):
+        """Queue a session row and its reading goal updates for the next flush_pending"""
+        session_row = (
+            child_id,
+            session.expected_text,
+            session.transcription,
+            session.accuracy.accuracy_score,
+            session.fluency.fluency_score,
+            session.pronunciation.pronunciation_score,
+            session.fluency.reading_speed,
+            json.dumps(session.accuracy.mistakes),
+            json.dumps(session.feedback or {})
+        )
+        
+        # Update accuracy and fluency goals
+        goal_rows = [
+            (session.accuracy.accuracy_score, child_id, 'accuracy'),
+            (session.fluency.fluency_score, child_id, 'fluency')
+        ]
+        
+        with self._pending_lock:
+            self._pending_sessions.append(session_row)
+            self._pending_goals.extend(goal_rows)
     
-    def _update_reading_goals(self, child_id: str, analysis_results: Dict):
-        """Update reading goals based on session results"""
+    def flush_pending(self):
+        """Write queued sessions and goal updates in a single transaction"""
+        with self._pending_lock:
+            sessions, self._pending_sessions = self._pending_sessions, []
+            goals, self._pending_goals = self._pending_goals, []
+        
+        if not sessions and not goals:
+            return
+        
         try:
-            cursor = self.conn.cursor()
-            
-            # Update accuracy goal
-            if 'accuracy_score' in analysis_results:
-                cursor.execute('''
-                    UPDATE reading_goals 
-                    SET current_value = ? 
-                    WHERE child_id = ? AND goal_type = 'accuracy' AND status = 'active'
-                ''', (analysis_results['accuracy_score'], child_id))
-            
-            # Update fluency goal
-            if 'fluency_score' in analysis_results:
-                cursor.execute('''
-                    UPDATE reading_goals 
-                    SET current_value = ? 
-                    WHERE child_id = ? AND goal_type = 'fluency' AND status = 'active'
-                ''', (analysis_results['fluency_score'], child_id))
-            
-            self.conn.commit()
+            with self._db_write_lock:
+                self.conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self.conn.executemany(INSERT_READING_SESSION_SQL, sessions)
+                    self.conn.executemany(UPDATE_READING_GOAL_SQL, goals)
+                    self.conn.commit()
+                except Exception:
+                    self.conn.rollback()
+                    raise
             
         except Exception as e:
-            print(f"Goal update failed: {e}")
+            print(f"Session storage failed: {e}")
+            # Keep the rows for the next flush, ahead of anything queued meanwhile
+            with self._pending_lock:
+                self._pending_sessions[:0] = sessions
+                self._pending_goals[:0] = goals
     
     def _normalize_text(self, text: str) -> str:
         """Normalize text for comparison"""
-        # Remove punctuation and convert to lowercase
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        return text
+        # Remove punctuation, convert to lowercase and collapse whitespace
+        return ' '.join(NON_WORD_RE.sub('', text.lower()).split())
+    
+    def close(self):
+        """Close the pooled OpenAI HTTP connections"""
+        self._http.close()
+    
+    async def aclose(self):
+        """Close the pooled OpenAI HTTP connections, including the running loop's async pool"""
+        self._http.close()
+        await self._aclose_async_client()
     
     def __del__(self):
         """Clean up database connection"""
@@ -23,6 +23,24 @@ echo "📚 Installing Python packages..."
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Download the OpenCV DNN face detector used by advanced_emotion_ai.py
+if [ ! -f "models/opencv_face_detector_uint8.pb" ]; then
+    echo "🙂 Downloading face detector model..."
+    mkdir -p models
+    curl -sSL -o models/opencv_face_detector_uint8.pb \
+        https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20180220_uint8/opencv_face_detector_uint8.pb
+    curl -sSL -o models/opencv_face_detector.pbtxt \
+        https://raw.githubusercontent.com/opencv/opencv/master/samples/dnn/face_detector/opencv_face_detector.pbtxt
+fi
+
+# Download the MediaPipe face landmarker task bundle
+if [ ! -f "models/face_landmarker.task" ]; then
+    echo "🙂 Downloading face landmarker model..."
+    mkdir -p models
+    curl -sSL -o models/face_landmarker.task \
+        https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task
+fi
+
 # Check if .env file exists
 if [ ! -f ".env" ]; then
     echo "⚙️  Creating .env file from template..."